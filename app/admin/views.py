@@ -3,7 +3,7 @@ from uuid import UUID
 
 import contextlib
 
-from sqlalchemy import BIGINT, Integer, and_, func, or_, select, text, update
+from sqlalchemy import BIGINT, Integer, and_, delete, func, or_, select, text, update
 from sqlalchemy.orm import noload, selectinload
 
 from fastadmin import (
@@ -20,9 +20,12 @@ from fastadmin import (
 )
 
 from app.authentication.models import AccessToken, OAuthAccount
+from app.core.metrics import Metric, metrics
 from app.core.models.db_helper import db_helper
+from app.notes.counter import notes_counter
 from app.notes.models import Note
 from app.users.models import User
+from app.utils.image_gc import image_gc
 
 try:
     from fastapi_users.password import PasswordHelper as _PasswordHelper
@@ -161,7 +164,7 @@ class UserAdmin(SqlAlchemyModelAdmin):
     async def chart_user_status(
         self, payload: WidgetActionInputSchema
     ) -> WidgetActionResponseSchema:
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             active = await session.scalar(
                 select(func.count()).select_from(User).where(User.is_active.is_(True))
@@ -189,7 +192,7 @@ class UserAdmin(SqlAlchemyModelAdmin):
     async def chart_user_roles(
         self, payload: WidgetActionInputSchema
     ) -> WidgetActionResponseSchema:
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             regular = await session.scalar(
                 select(func.count()).select_from(User).where(User.is_superuser.is_(False))
@@ -217,7 +220,7 @@ class UserAdmin(SqlAlchemyModelAdmin):
     async def chart_user_verification(
         self, payload: WidgetActionInputSchema
     ) -> WidgetActionResponseSchema:
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             verified = await session.scalar(
                 select(func.count()).select_from(User).where(User.is_verified.is_(True))
@@ -249,6 +252,7 @@ class NoteAdmin(SqlAlchemyModelAdmin):
         "chart_note_types",
         "chart_note_media",
         "chart_note_lifetime",
+        "chart_notes_total",
     )
 
     @action(description="Delete expired notes")
@@ -256,16 +260,19 @@ class NoteAdmin(SqlAlchemyModelAdmin):
         now = datetime.now(tz=timezone.utc)
         sessionmaker = self.get_sessionmaker()
         async with sessionmaker() as session:
-            result = await session.scalars(
-                select(Note).where(
+            images = await session.scalars(
+                delete(Note)
+                .where(
                     Note.id.in_(ids),
                     Note.lifetime.isnot(None),
                     Note.lifetime < now,
                 )
+                .returning(Note.image)
             )
-            for note in result.all():
-                await session.delete(note)
+            images = images.all()
             await session.commit()
+        metrics.inc(Metric.NOTES_EXPIRED, len(images))
+        await image_gc.remove(images)
 
 
     @widget_action(
@@ -283,7 +290,7 @@ class NoteAdmin(SqlAlchemyModelAdmin):
     async def chart_note_types(
         self, payload: WidgetActionInputSchema
     ) -> WidgetActionResponseSchema:
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             ephemeral = await session.scalar(
                 select(func.count()).select_from(Note).where(Note.is_ephemeral.is_(True))
@@ -311,7 +318,7 @@ class NoteAdmin(SqlAlchemyModelAdmin):
     async def chart_note_media(
         self, payload: WidgetActionInputSchema
     ) -> WidgetActionResponseSchema:
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             with_image = await session.scalar(
                 select(func.count()).select_from(Note).where(Note.image.isnot(None))
@@ -340,7 +347,7 @@ class NoteAdmin(SqlAlchemyModelAdmin):
         self, payload: WidgetActionInputSchema
     ) -> WidgetActionResponseSchema:
         now = datetime.now(tz=timezone.utc)
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             active = await session.scalar(
                 select(func.count()).select_from(Note).where(
@@ -362,6 +369,47 @@ class NoteAdmin(SqlAlchemyModelAdmin):
         ])
 
 
+    @widget_action(
+        tab="Overview",
+        title="Total Notes",
+        description="Stored notes: running counter, exact COUNT(*) or planner estimate",
+        widget_action_type=WidgetActionType.ChartBar,
+        widget_action_props=WidgetActionChartProps(
+            x_field="mode",
+            y_field="count",
+        ),
+        widget_action_filters=[
+            WidgetActionFilter(
+                field_name="mode",
+                widget_type=WidgetType.Select,
+                widget_props={
+                    "options": [
+                        {"label": "Counter", "value": "counter"},
+                        {"label": "Exact", "value": "exact"},
+                        {"label": "Estimated", "value": "estimated"},
+                    ],
+                    "defaultValue": "counter",
+                },
+            )
+        ],
+        width=12,
+    )
+    async def chart_notes_total(
+        self, payload: WidgetActionInputSchema
+    ) -> WidgetActionResponseSchema:
+        mode = "counter"
+        for q in payload.query:
+            if q.field_name == "mode" and q.value in ("counter", "exact", "estimated"):
+                mode = q.value
+
+        sessionmaker = db_helper.read_session_factory()
+        async with sessionmaker() as session:
+            total = await notes_counter.get(session, mode=mode)
+        return WidgetActionResponseSchema(data=[
+            {"mode": mode.capitalize(), "count": total},
+        ])
+
+
 @register(AccessToken, sqlalchemy_sessionmaker=db_helper.session_factory)
 class AccessTokenAdmin(SqlAlchemyModelAdmin):
     menu_section = "Auth & Security"
@@ -401,7 +449,7 @@ class AccessTokenAdmin(SqlAlchemyModelAdmin):
     async def chart_tokens_activity(
         self, payload: WidgetActionInputSchema
     ) -> WidgetActionResponseSchema:
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             total = await session.scalar(
                 select(func.count()).select_from(AccessToken)
@@ -461,7 +509,7 @@ class OAuthAccountAdmin(SqlAlchemyModelAdmin):
                 except (TypeError, ValueError):
                     pass
 
-        sessionmaker = self.get_sessionmaker()
+        sessionmaker = db_helper.read_session_factory()
         async with sessionmaker() as session:
             rows = await session.execute(
                 select(OAuthAccount.oauth_name, func.count().label("count"))
@@ -5,6 +5,7 @@ from app.authentication.messages import router as message_router
 from app.authentication.router import router as auth_router
 from app.authentication.service import router as service_router
 from app.core.config import settings
+from app.localization import set_locale
 from app.notes.router import router as note_router
 from app.pages.router import router as pages_router
 from app.users.router import router as user_router
@@ -18,9 +19,11 @@ router = APIRouter(
 
 router.include_router(
     note_router,
+    dependencies=[Depends(set_locale)],
 )
 router.include_router(
     pages_router,
+    dependencies=[Depends(set_locale)],
 )
 router.include_router(
     user_router,
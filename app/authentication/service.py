@@ -1,7 +1,10 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 
 from app.core.config import settings
-from app.requests_count_middleware import requests_count_middleware_dispatch
+from app.core.leader import leader_election
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, render_metrics
+from app.requests_count_middleware import requests_stats
 from fastapi import status
 
 router = APIRouter(
@@ -23,10 +26,38 @@ router = APIRouter(
     },
 )
 def get_path_stats():
-    return {
+    paths = {
         path: {
             "count": stats.count,
             "statuses": dict(stats.statuses_counts),
+            "latency": {
+                "p50": stats.latency_quantile(0.5),
+                "p90": stats.latency_quantile(0.9),
+                "p99": stats.latency_quantile(0.99),
+                "max": stats.latency_max,
+            },
         }
-        for path, stats in requests_count_middleware_dispatch.counts.items()
+        for path, stats in requests_stats.snapshot().items()
     }
+    # route keys always start with "/" or "<", so this cannot collide
+    return {
+        "scheduler": {
+            "leader_pid": leader_election.leader_pid(),
+            "is_leader": leader_election.is_leader,
+        },
+        **paths,
+    }
+
+
+@router.get(
+    "/metrics",
+    summary="Get metrics",
+    response_description="Metrics in the Prometheus text format",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        render_metrics(requests_stats),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+
+import orjson
+from jinja2 import pass_context
+
+from app.core.compression import write_atomic
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+STATIC_DIR = Path("app/static")
+ASSETS_DIR = STATIC_DIR / "dist"
+MANIFEST_NAME = "manifest.json"
+
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_WHITESPACE = re.compile(r"\s+")
+CSS_PUNCTUATION = re.compile(r"\s*([{};])\s*")
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and redundant whitespace; selectors and values are kept as is."""
+    source = CSS_COMMENT.sub("", source)
+    source = CSS_WHITESPACE.sub(" ", source)
+    return CSS_PUNCTUATION.sub(r"\1", source).strip()
+
+
+class AssetManifest:
+    """Content-hashed copies of the static assets the templates link to.
+
+    ``build`` writes ``dist/css/style.<hash>.css`` style copies next to a
+    ``manifest.json`` mapping logical names to them. The hashed files never
+    change, so they are served with an immutable ``Cache-Control``; a new
+    deploy changes the hash and therefore the URL. Files from the previous
+    build are kept for pages that are still cached with the old URLs.
+    """
+
+    def __init__(
+        self,
+        source_dir: Path,
+        output_dir: Path,
+        names: tuple[str, ...],
+        minify: bool,
+    ) -> None:
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.names = names
+        self.minify = minify
+        self.paths: dict[str, str] = {}
+
+    def build(self) -> dict[str, str]:
+        previous = self._read_manifest()
+        paths = {}
+        for name in self.names:
+            data = (self.source_dir / name).read_bytes()
+            if self.minify and name.endswith(".css"):
+                data = minify_css(data.decode()).encode()
+            digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+            source = Path(name)
+            hashed = source.with_name(f"{source.stem}.{digest}{source.suffix}").as_posix()
+            target = self.output_dir / hashed
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(target, data)
+            paths[name] = hashed
+
+        write_atomic(self.output_dir / MANIFEST_NAME, orjson.dumps(paths, option=orjson.OPT_INDENT_2))
+        self._prune(keep=set(paths.values()) | set(previous.values()))
+        self.paths = paths
+        log.info("Built %d static assets", len(paths))
+        return paths
+
+    def path_for(self, name: str) -> str | None:
+        """Hashed path of ``name`` relative to the assets mount, if it was built."""
+        return self.paths.get(name)
+
+    def _read_manifest(self) -> dict[str, str]:
+        try:
+            return orjson.loads((self.output_dir / MANIFEST_NAME).read_bytes())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return {}
+
+    def _prune(self, keep: set[str]) -> None:
+        for path in self.output_dir.rglob("*"):
+            if not path.is_file() or path.name == MANIFEST_NAME:
+                continue
+            # precompressed siblings follow their asset
+            relative = path.relative_to(self.output_dir).as_posix()
+            if relative.removesuffix(".gz").removesuffix(".br") not in keep:
+                path.unlink(missing_ok=True)
+
+
+assets = AssetManifest(
+    source_dir=STATIC_DIR,
+    output_dir=ASSETS_DIR,
+    names=settings.assets.names,
+    minify=settings.assets.minify_css,
+)
+
+
+@pass_context
+def asset_url(context, name: str) -> str:
+    """Template helper: URL of the fingerprinted copy of a static asset."""
+    request = context["request"]
+    path = assets.path_for(name)
+    if path is None:
+        return str(request.url_for("static", path=name))
+    return str(request.url_for("assets", path=path))
@@ -0,0 +1,308 @@
+import logging
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+STATIC_SUFFIXES = (".css", ".js", ".html", ".svg", ".json", ".txt", ".map")
+ETAG_SUFFIXES = {"br": "-br", "zstd": "-zstd", "gzip": "-gzip"}
+STATIC_SIBLINGS = {"br": ".br", "gzip": ".gz"}
+# mkstemp creates 0600 files, static files must stay readable by the web server
+STATIC_FILE_MODE = 0o644
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Supported encodings, most preferred first."""
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return tuple(encodings)
+
+
+def select_encoding(accept_encoding: str, encodings: tuple[str, ...]) -> str | None:
+    """Pick the first of ``encodings`` the client accepts with a non-zero q-value."""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in encodings:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the ``encoding`` variant of a representation with ``etag``."""
+    if not etag.endswith('"'):
+        return etag
+    return f"{etag[:-1]}{ETAG_SUFFIXES[encoding]}\""
+
+
+def strip_etag_encoding(if_none_match: str) -> str:
+    for suffix in ETAG_SUFFIXES.values():
+        if_none_match = if_none_match.replace(f'{suffix}"', '"')
+    return if_none_match
+
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """Compresses text responses with brotli, zstd or gzip.
+
+    brotli and zstd are used when their optional packages are installed.
+    Responses that already have a ``Content-Encoding`` (precompressed
+    static files) or are smaller than ``minimum_size`` are passed through.
+    Strong ETags get an encoding suffix so each variant has its own
+    validator; the suffix is stripped from ``If-None-Match`` before the
+    request reaches the app.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        gzip_level: int,
+        brotli_quality: int,
+        zstd_level: int,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = select_encoding(
+            request_headers.get("accept-encoding", ""), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # clients revalidate with the ETag of the encoded variant they hold
+        if_none_match = request_headers.get("if-none-match", "")
+        stripped = strip_etag_encoding(if_none_match)
+        if stripped != if_none_match:
+            MutableHeaders(scope=scope)["if-none-match"] = stripped
+
+        responder = _CompressionResponder(
+            self, encoding, send, revalidates_variant=stripped != if_none_match
+        )
+        await self.app(scope, receive, responder)
+
+    def compressor(self, encoding: str) -> _GzipCompressor | _BrotliCompressor | _ZstdCompressor:
+        level = self.levels[encoding]
+        match encoding:
+            case "br":
+                return _BrotliCompressor(level)
+            case "zstd":
+                return _ZstdCompressor(level)
+        return _GzipCompressor(level)
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        encoding: str,
+        send: Send,
+        revalidates_variant: bool,
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.revalidates_variant = revalidates_variant
+        self.start_message: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message["status"] == 304:
+                if self.revalidates_variant and "etag" in headers:
+                    mutable_headers = MutableHeaders(scope=message)
+                    mutable_headers["etag"] = encoded_etag(headers["etag"], self.encoding)
+                    mutable_headers.add_vary_header("Accept-Encoding")
+                self.passthrough = True
+            elif "content-encoding" in headers or not headers.get(
+                "content-type", ""
+            ).startswith(COMPRESSIBLE_TYPES):
+                self.passthrough = True
+            else:
+                self.start_message = message
+                return
+            await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(scope=start_message)
+            if not more_body and len(body) < self.middleware.minimum_size:
+                headers.add_vary_header("Accept-Encoding")
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+
+            self.compressor = self.middleware.compressor(self.encoding)
+            self._mark_compressed(headers)
+            if more_body:
+                del headers["content-length"]
+                await self.send(start_message)
+            else:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["content-length"] = str(len(compressed))
+                await self.send(start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _mark_compressed(self, headers: MutableHeaders) -> None:
+        headers.add_vary_header("Accept-Encoding")
+        headers["content-encoding"] = self.encoding
+        if "etag" in headers:
+            headers["etag"] = encoded_etag(headers["etag"], self.encoding)
+
+
+def precompress_static(
+    directory: Path,
+    skip_dirs: tuple[str, ...] = (),
+    gzip_level: int = 9,
+    brotli_quality: int = 11,
+) -> int:
+    """Write ``.gz`` (and ``.br``) siblings for text files under ``directory``.
+
+    Siblings that are newer than their source are kept, so this is cheap
+    to run on every startup; files are replaced atomically because every
+    worker runs it. Returns the number of files written.
+    """
+    written = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if name not in skip_dirs]
+        for name in files:
+            path = Path(root, name)
+            if path.suffix not in STATIC_SUFFIXES:
+                continue
+            written += _precompress_file(path, gzip_level, brotli_quality)
+    if written:
+        log.info("Precompressed %d static files", written)
+    return written
+
+
+def _precompress_file(path: Path, gzip_level: int, brotli_quality: int) -> int:
+    source_mtime = path.stat().st_mtime_ns
+    data = None
+    written = 0
+    for encoding, suffix in STATIC_SIBLINGS.items():
+        if encoding == "br" and brotli is None:
+            continue
+        sibling = path.with_name(path.name + suffix)
+        if sibling.exists() and sibling.stat().st_mtime_ns >= source_mtime:
+            continue
+        if data is None:
+            data = path.read_bytes()
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=brotli_quality)
+        else:
+            compressed = _gzip_file(data, gzip_level)
+        write_atomic(sibling, compressed)
+        written += 1
+    return written
+
+
+def _gzip_file(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return compressor.compress(data) + compressor.flush()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            os.fchmod(file.fileno(), STATIC_FILE_MODE)
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
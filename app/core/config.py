@@ -1,7 +1,7 @@
 from pathlib import Path
 from typing import Literal
 
-from pydantic import BaseModel, PostgresDsn
+from pydantic import BaseModel, Field, PostgresDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -33,6 +33,7 @@ class LoggingConfig(BaseModel):
         "CRITICAL",
     ] = "INFO"
     log_format: str = LOG_DEFAULT_FORMAT
+    access_log_sample_rate: float = Field(1.0, ge=0, le=1)
 
 
 class ApiV1Prefix(BaseModel):
@@ -62,6 +63,9 @@ class DatabaseConfig(BaseModel):
     echo_pool: bool = False
     pool_size: int = 50
     max_overflow: int = 10
+    replica_urls: list[PostgresDsn] = []
+    replica_health_check_interval: float = 5.0
+    replica_health_check_timeout: float = 2.0
 
     naming_convention: dict[str, str] = {
         "ix": "ix_%(column_0_label)s",
@@ -72,6 +76,83 @@ class DatabaseConfig(BaseModel):
     }
 
 
+class NotesConfig(BaseModel):
+    count_cache_ttl: float = 5.0
+    batch_max_size: int = 1000
+    sweep_batch_size: int = 500
+    expiry_horizon_seconds: int = 3600
+    expiry_batch_size: int = 100
+    expiry_seed_limit: int = 10000
+    expiry_retry_seconds: float = 5.0
+    expiry_poll_seconds: float = 5.0
+    partitions_ahead: int = 7
+    partition_maintenance_minutes: int = 30
+    partition_lock_timeout: str = "5s"
+
+
+class ImagesConfig(BaseModel):
+    gc_grace_seconds: int = 3600
+    gc_batch_size: int = 500
+    gc_interval_minutes: int = 60
+    consumed_delay_seconds: int = 300
+    max_upload_bytes: int = 5 * 1024 * 1024
+    # whole multipart body: the image plus the other form fields
+    max_form_bytes: int = 6 * 1024 * 1024
+    upload_chunk_size: int = 64 * 1024
+
+
+class SchedulerConfig(BaseModel):
+    # any bigint shared by all workers of the deployment
+    leader_lock_id: int = 0x6E6F746573
+    leader_check_interval: float = 10.0
+
+
+class StatsConfig(BaseModel):
+    max_keys: int = 256
+    max_statuses: int = 16
+    latency_buckets: tuple[float, ...] = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    )
+
+
+class PageCacheConfig(BaseModel):
+    max_entries: int = 512
+    max_bytes: int = 16 * 1024 * 1024
+    home_ttl: float = 5.0
+    account_ttl: float = 300.0
+    result_ttl: float = 60.0
+    home_cache_control: str = "no-cache"
+    account_cache_control: str = "private, max-age=300"
+    result_cache_control: str = "private, max-age=60"
+    static_cache_control: str = "public, max-age=3600"
+    asset_cache_control: str = "public, max-age=31536000, immutable"
+    images_cache_control: str = "private, no-store"
+
+
+class AssetsConfig(BaseModel):
+    names: tuple[str, ...] = (
+        "css/style.css",
+        "js/auth.js",
+        "js/main.js",
+        "js/pages.js",
+    )
+    minify_css: bool = True
+
+
+class TemplatesConfig(BaseModel):
+    # None uses Jinja's per-user directory in the system temp dir
+    bytecode_cache_dir: Path | None = None
+    precompile: bool = True
+
+
+class CompressionConfig(BaseModel):
+    minimum_size: int = 500
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    zstd_level: int = 3
+    precompress_static: bool = True
+
+
 class AccessToken(BaseModel):
     lifetime_seconds: int = 3600
     reset_password_token_secret: str
@@ -94,6 +175,14 @@ class Settings(BaseSettings):
     oauth2: Oauth2
     access_token: AccessToken
     db: DatabaseConfig
+    notes: NotesConfig = NotesConfig()
+    images: ImagesConfig = ImagesConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    stats: StatsConfig = StatsConfig()
+    page_cache: PageCacheConfig = PageCacheConfig()
+    compression: CompressionConfig = CompressionConfig()
+    assets: AssetsConfig = AssetsConfig()
+    templates: TemplatesConfig = TemplatesConfig()
 
     model_config = SettingsConfigDict(
         env_file=(
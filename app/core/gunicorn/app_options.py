@@ -9,7 +9,8 @@ def get_app_options(
     log_level: str,
 ) -> dict:
     return {
-        "accesslog": "-",
+        # access lines are written by the app, see AccessLogMiddleware
+        "accesslog": None,
         "errorlog": "-",
         "bind": f"{host}:{port}",
         "loglevel": log_level,
@@ -0,0 +1,132 @@
+import hashlib
+import mimetypes
+import os
+from collections import OrderedDict
+from os import PathLike
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.compression import STATIC_SIBLINGS, encoded_etag, select_encoding
+
+
+def strong_etag(data: bytes) -> str:
+    return f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+class HashedStaticFiles(StaticFiles):
+    """StaticFiles with content-hash ETags and a fixed ``Cache-Control``.
+
+    The hash of each file is computed once and reused until its size or
+    mtime changes; at most ``max_etags`` hashes are kept. With
+    ``content_etags=False`` Starlette's size/mtime ETag is used instead,
+    which suits directories of large or short-lived files. Paths in
+    ``hidden`` and their precompressed siblings are not served. When the
+    client accepts it and an up-to-date ``.br`` or ``.gz`` sibling exists
+    (see ``precompress_static``), the sibling is sent as is with the
+    matching ``Content-Encoding``.
+    """
+
+    def __init__(
+        self,
+        *args,
+        cache_control: str,
+        content_etags: bool = True,
+        max_etags: int = 1024,
+        hidden: tuple[str, ...] = (),
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+        self.hidden = frozenset(
+            name + suffix for name in hidden for suffix in ("", *STATIC_SIBLINGS.values())
+        )
+        self.content_etags = content_etags
+        self.max_etags = max_etags
+        self._etags: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+
+    def lookup_path(self, path: str) -> tuple[str, os.stat_result | None]:
+        if path in self.hidden:
+            return "", None
+        return super().lookup_path(path)
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {"cache-control": self.cache_control}
+        if self.content_etags:
+            headers["etag"] = self._etag(full_path, stat_result)
+        siblings = self._siblings(full_path, stat_result)
+        if siblings:
+            headers["vary"] = "Accept-Encoding"
+
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, headers=headers
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        encoding = select_encoding(
+            request_headers.get("accept-encoding", ""), tuple(siblings)
+        )
+        if encoding is None:
+            return response
+        sibling_path, sibling_stat = siblings[encoding]
+        return FileResponse(
+            sibling_path,
+            status_code=status_code,
+            stat_result=sibling_stat,
+            media_type=mimetypes.guess_type(os.fspath(full_path))[0],
+            headers=headers
+            | {
+                "etag": encoded_etag(response.headers["etag"], encoding),
+                "content-encoding": encoding,
+            },
+        )
+
+    @staticmethod
+    def _siblings(
+        full_path: PathLike, stat_result: os.stat_result
+    ) -> dict[str, tuple[str, os.stat_result]]:
+        siblings = {}
+        for encoding, suffix in STATIC_SIBLINGS.items():
+            sibling_path = os.fspath(full_path) + suffix
+            try:
+                sibling_stat = os.stat(sibling_path)
+            except FileNotFoundError:
+                continue
+            if sibling_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+                siblings[encoding] = (sibling_path, sibling_stat)
+        return siblings
+
+    def _etag(self, full_path: PathLike, stat_result: os.stat_result) -> str:
+        path = os.fspath(full_path)
+        cached = self._etags.get(path)
+        if cached and cached[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+            self._etags.move_to_end(path)
+            return cached[2]
+        with open(path, "rb") as file:
+            etag = f'"{hashlib.file_digest(file, lambda: hashlib.blake2b(digest_size=16)).hexdigest()}"'
+        self._etags[path] = (stat_result.st_mtime_ns, stat_result.st_size, etag)
+        self._etags.move_to_end(path)
+        while len(self._etags) > self.max_etags:
+            self._etags.popitem(last=False)
+        return etag
@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.metrics import LEADER_GAUGES, Metric, metrics
+
+log = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Elects one worker to run scheduler jobs with a Postgres advisory lock.
+
+    The leader holds a session-level ``pg_try_advisory_lock`` on its own
+    unpooled connection. When the leader exits or its connection drops,
+    Postgres releases the lock and another worker takes it on its next
+    attempt, at most ``interval`` seconds later. The leader's PID is
+    published through the shared metrics so every worker can report it.
+    """
+
+    def __init__(self, engine: AsyncEngine, lock_id: int, interval: float) -> None:
+        self.engine = engine
+        self.lock_id = lock_id
+        self.interval = interval
+        self._connection: AsyncConnection | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._connection is not None
+
+    @staticmethod
+    def leader_pid() -> int | None:
+        """PID of the leader among the live workers on this host."""
+        marker = Metric.SCHEDULER_LEADER_PID
+        return metrics.marked_values(marker)[marker] or None
+
+    def leader_only[**P](
+        self, func: Callable[P, Awaitable[object]]
+    ) -> Callable[P, Awaitable[None]]:
+        """Wrap a job so it only runs in the leader."""
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> None:
+            if not self.is_leader:
+                log.debug("Skipping %s, not the scheduler leader", func.__name__)
+                return
+            await func(*args, **kwargs)
+
+        return wrapper
+
+    async def start(self) -> None:
+        await self.campaign()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._resign()
+
+    async def campaign(self) -> None:
+        """Take the lock if it is free, or confirm the lock is still held."""
+        try:
+            if self._connection is None:
+                await self._acquire()
+            else:
+                await self._connection.execute(text("SELECT 1"))
+                await self._connection.commit()
+        except (OSError, SQLAlchemyError):
+            log.exception("Scheduler leader election failed")
+            await self._resign()
+
+    async def _acquire(self) -> None:
+        connection = await self.engine.connect()
+        try:
+            acquired = await connection.scalar(select(func.pg_try_advisory_lock(self.lock_id)))
+            # keep the lock without sitting idle in a transaction
+            await connection.commit()
+        except BaseException:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return
+        self._connection = connection
+        metrics.set(Metric.SCHEDULER_LEADER_PID, os.getpid())
+        log.info("Worker %d is the scheduler leader", os.getpid())
+
+    async def _resign(self) -> None:
+        connection, self._connection = self._connection, None
+        for metric, _, _ in LEADER_GAUGES:
+            metrics.set(metric, 0)
+        if connection is None:
+            return
+        # closing the unpooled connection ends the session and frees the lock
+        with contextlib.suppress(OSError, SQLAlchemyError):
+            await connection.close()
+        log.info("Worker %d resigned as scheduler leader", os.getpid())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.campaign()
+
+
+leader_election = LeaderElection(
+    engine=create_async_engine(str(settings.db.url), poolclass=NullPool),
+    lock_id=settings.scheduler.leader_lock_id,
+    interval=settings.scheduler.leader_check_interval,
+)
@@ -1,16 +1,36 @@
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 from fastapi import FastAPI
 
+from app.core.compression import precompress_static
+from app.core.config import settings
+from app.core.leader import leader_election
 from app.core.models.db_helper import db_helper
 from app.core.scheduler import start_scheduler
+from app.core.templates import precompile_templates
+from app.notes.expiry import expiry_engine
+from app.notes.partitions import detect_partition_interval
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    scheduler = start_scheduler()
+    if settings.compression.precompress_static:
+        await asyncio.to_thread(precompress_static, Path("app/static"), ("images",))
+    if settings.templates.precompile:
+        await asyncio.to_thread(precompile_templates)
+    await db_helper.start_health_checks()
+    await leader_election.start()
+    partition_interval = await detect_partition_interval(db_helper)
+    scheduler = start_scheduler(partition_interval)
+    # with partitioning, expired notes are dropped per partition instead
+    if partition_interval is None:
+        await expiry_engine.start()
 
     yield
+    await expiry_engine.stop()
     scheduler.shutdown()
+    await leader_election.stop()
     await db_helper.dispose()
@@ -0,0 +1,107 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import TextIO
+
+import orjson
+
+from app.core.config import settings
+
+ACCESS_LOGGER_NAME = "app.access"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed as ``extra={"fields": {...}}`` are inlined."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(payload).decode()
+
+
+class AccessLogFilter(logging.Filter):
+    def __init__(self, access: bool) -> None:
+        super().__init__()
+        self.access = access
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return (record.name == ACCESS_LOGGER_NAME) == self.access
+
+
+class LoggingPipeline:
+    """Root logging through a queue drained by a background thread.
+
+    Request handlers only enqueue records; writing to the stream happens
+    in the listener thread, so slow stdout never blocks the event loop.
+    Access records are written as JSON, everything else with the
+    configured text format. The listener is stopped around ``fork`` so the
+    gunicorn master forks its workers single-threaded, then restarted in
+    both processes.
+    """
+
+    def __init__(self, stream: TextIO, level: str, log_format: str) -> None:
+        text_handler = logging.StreamHandler(stream)
+        text_handler.setFormatter(logging.Formatter(log_format))
+        text_handler.addFilter(AccessLogFilter(access=False))
+        access_handler = logging.StreamHandler(stream)
+        access_handler.setFormatter(JsonFormatter())
+        access_handler.addFilter(AccessLogFilter(access=True))
+        self.handlers = (text_handler, access_handler)
+
+        self.queue_handler = QueueHandler(queue.SimpleQueue())
+        self.level = level
+        self.listener: QueueListener | None = None
+        self._paused = False
+
+    def start(self) -> None:
+        root = logging.getLogger()
+        root.handlers = [self.queue_handler]
+        root.setLevel(self.level)
+        self._start_listener()
+        os.register_at_fork(
+            before=self._pause,
+            after_in_parent=self._resume,
+            after_in_child=self._resume,
+        )
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def _start_listener(self) -> None:
+        self.listener = QueueListener(
+            self.queue_handler.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def _pause(self) -> None:
+        if self.listener is not None:
+            self.stop()
+            self._paused = True
+
+    def _resume(self) -> None:
+        if self._paused:
+            self._paused = False
+            self._start_listener()
+
+
+def setup_logging(stream: TextIO = sys.stdout) -> LoggingPipeline:
+    pipeline = LoggingPipeline(
+        stream=stream,
+        level=settings.logging.log_level,
+        log_format=settings.logging.log_format,
+    )
+    pipeline.start()
+    return pipeline
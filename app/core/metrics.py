@@ -0,0 +1,148 @@
+import functools
+import time
+from collections.abc import Awaitable, Callable
+from enum import IntEnum
+
+from app.core.config import settings
+from app.core.shared_stats import SharedMetrics, SharedRequestStats
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metric(IntEnum):
+    NOTES_CREATED = 0
+    NOTES_REVEALED = 1
+    NOTES_EXPIRED = 2
+    IMAGE_UPLOAD_BYTES = 3
+    DB_POOL_CHECKED_OUT = 4
+    DB_POOL_OVERFLOW = 5
+    DB_POOL_WAITS = 6
+    DB_POOL_WAIT_MICROSECONDS = 7
+    SWEEP_JOB_RUNS = 8
+    SWEEP_JOB_MICROSECONDS = 9
+    IMAGE_GC_JOB_RUNS = 10
+    IMAGE_GC_JOB_MICROSECONDS = 11
+    SCHEDULER_LEADER_PID = 12
+    PARTITION_JOB_RUNS = 13
+    PARTITION_JOB_MICROSECONDS = 14
+    SWEEP_BACKLOG = 15
+    SWEEP_ROWS_PER_SECOND = 16
+
+
+COUNTERS = (
+    (Metric.NOTES_CREATED, "notes_created_total", "Notes created."),
+    (Metric.NOTES_REVEALED, "notes_revealed_total", "Notes revealed."),
+    (Metric.NOTES_EXPIRED, "notes_expired_total", "Expired notes deleted."),
+    (Metric.IMAGE_UPLOAD_BYTES, "image_upload_bytes_total", "Bytes of uploaded images stored."),
+)
+GAUGES = (
+    (Metric.DB_POOL_CHECKED_OUT, "db_pool_checked_out", "Connections checked out of the pool."),
+    (Metric.DB_POOL_OVERFLOW, "db_pool_overflow", "Connections open beyond the pool size."),
+)
+# set by the scheduler leader, reported from its region only and cleared when it resigns
+LEADER_GAUGES = (
+    (
+        Metric.SCHEDULER_LEADER_PID,
+        "scheduler_leader_pid",
+        "PID of the worker running scheduler jobs, 0 if it is not on this host.",
+    ),
+    (Metric.SWEEP_BACKLOG, "sweep_backlog_notes", "Expired notes left after the last sweep."),
+    (
+        Metric.SWEEP_ROWS_PER_SECOND,
+        "sweep_rows_per_second",
+        "Delete throughput of the last sweep.",
+    ),
+)
+JOBS = {
+    "delete_expired_notes": (Metric.SWEEP_JOB_RUNS, Metric.SWEEP_JOB_MICROSECONDS),
+    "image_gc_reconcile": (Metric.IMAGE_GC_JOB_RUNS, Metric.IMAGE_GC_JOB_MICROSECONDS),
+    "partition_maintenance": (Metric.PARTITION_JOB_RUNS, Metric.PARTITION_JOB_MICROSECONDS),
+}
+
+# created on import, before gunicorn forks its workers
+metrics = SharedMetrics(
+    regions=2 * settings.gunicorn.workers,
+    size=len(Metric),
+    gauges=tuple(metric for metric, _, _ in (*GAUGES, *LEADER_GAUGES)),
+)
+
+
+def timed_job[**P](
+    name: str, func: Callable[P, Awaitable[object]]
+) -> Callable[P, Awaitable[None]]:
+    """Wrap a scheduler job so its runs and duration are exported."""
+    runs, micros = JOBS[name]
+
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> None:
+        start_time = time.perf_counter()
+        try:
+            await func(*args, **kwargs)
+        finally:
+            metrics.inc(runs)
+            metrics.inc(micros, int((time.perf_counter() - start_time) * 1_000_000))
+
+    return wrapper
+
+
+def render_metrics(requests_stats: SharedRequestStats) -> str:
+    """Prometheus text exposition of request stats and application metrics."""
+    lines = []
+    totals = metrics.totals()
+    live = metrics.totals(live_only=True)
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    snapshot = requests_stats.snapshot()
+    family("http_requests_total", "counter", "HTTP requests by route and status.")
+    for route, stats in snapshot.items():
+        for status_code, hits in stats.statuses_counts.items():
+            lines.append(
+                f'http_requests_total{{route="{_escape(route)}",status="{status_code}"}} {hits}'
+            )
+
+    family("http_request_duration_seconds", "histogram", "HTTP request latency by route.")
+    for route, stats in snapshot.items():
+        label = f'route="{_escape(route)}"'
+        cumulative = 0
+        for bound, hits in zip(stats.latency_bounds, stats.latency_buckets):
+            cumulative += hits
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{label},le="{le}"}} {cumulative}'
+            )
+        lines.append(f"http_request_duration_seconds_sum{{{label}}} {stats.latency_sum}")
+        lines.append(f"http_request_duration_seconds_count{{{label}}} {stats.count}")
+
+    for metric, name, help_text in COUNTERS:
+        family(name, "counter", help_text)
+        lines.append(f"{name} {totals[metric]}")
+
+    for metric, name, help_text in GAUGES:
+        family(name, "gauge", help_text)
+        lines.append(f"{name} {live[metric]}")
+
+    # read from the leader's own region, summing would add stale values
+    leader = metrics.marked_values(Metric.SCHEDULER_LEADER_PID)
+    for metric, name, help_text in LEADER_GAUGES:
+        family(name, "gauge", help_text)
+        lines.append(f"{name} {leader[metric]}")
+
+    family("db_pool_wait_seconds", "summary", "Time spent waiting for a pooled connection.")
+    lines.append(f"db_pool_wait_seconds_sum {totals[Metric.DB_POOL_WAIT_MICROSECONDS] / 1_000_000}")
+    lines.append(f"db_pool_wait_seconds_count {totals[Metric.DB_POOL_WAITS]}")
+
+    family("scheduler_job_duration_seconds", "summary", "Duration of scheduler job runs.")
+    for job, (runs, micros) in JOBS.items():
+        lines.append(
+            f'scheduler_job_duration_seconds_sum{{job="{job}"}} {totals[micros] / 1_000_000}'
+        )
+        lines.append(f'scheduler_job_duration_seconds_count{{job="{job}"}} {totals[runs]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,11 +1,65 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+import time
+from collections.abc import Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
                                     async_sessionmaker, create_async_engine)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+from sqlalchemy.pool.base import ConnectionPoolEntry
 from typing_extensions import AsyncGenerator
 
 from app.core.config import settings
+from app.core.metrics import Metric, metrics
+
+log = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Default async pool that publishes its usage and checkout wait time."""
+
+    def connect(self) -> PoolProxiedConnection:
+        start_time = time.perf_counter()
+        connection = super().connect()
+        metrics.inc(Metric.DB_POOL_WAITS)
+        metrics.inc(
+            Metric.DB_POOL_WAIT_MICROSECONDS,
+            int((time.perf_counter() - start_time) * 1_000_000),
+        )
+        self._publish_usage()
+        return connection
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._publish_usage()
+
+    def _publish_usage(self) -> None:
+        metrics.set(Metric.DB_POOL_CHECKED_OUT, self.checkedout())
+        metrics.set(Metric.DB_POOL_OVERFLOW, max(self.overflow(), 0))
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.session_factory = _session_factory(engine)
+        # trusted until the first health check says otherwise
+        self.healthy = True
 
 
 class DataBaseHelper:
+    """Engine for the primary database plus optional read replicas.
+
+    ``session_getter`` always uses the primary. ``read_session_getter``
+    picks healthy replicas round-robin and falls back to the primary when
+    there are none; use it only for queries that tolerate replication lag
+    and never write. Replicas are pinged in the background and are also
+    taken out of rotation when a request loses its connection to one.
+    """
+
     def __init__(
         self,
         url: str,
@@ -13,6 +67,9 @@ class DataBaseHelper:
         echo_pool: bool = False,
         pool_size: int = 5,
         max_overflow: int = 10,
+        replica_urls: Sequence[str] = (),
+        health_check_interval: float = 5.0,
+        health_check_timeout: float = 2.0,
     ) -> None:
         self.engine: AsyncEngine = create_async_engine(
             url=url,
@@ -20,21 +77,112 @@ class DataBaseHelper:
             echo_pool=echo_pool,
             pool_size=pool_size,
             max_overflow=max_overflow,
+            poolclass=InstrumentedQueuePool,
         )
-        self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
-            bind=self.engine,
-            autoflush=False,
-            autocommit=False,
-            expire_on_commit=False,
+        self.session_factory: async_sessionmaker[AsyncSession] = _session_factory(
+            self.engine
         )
+        # replicas keep the default pool, the pool gauges describe the primary
+        self.replicas = [
+            Replica(
+                create_async_engine(
+                    url=replica_url,
+                    echo=echo,
+                    echo_pool=echo_pool,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                )
+            )
+            for replica_url in replica_urls
+        ]
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._next_replica = itertools.count()
+        self._health_task: asyncio.Task | None = None
 
     async def dispose(self) -> None:
+        await self.stop_health_checks()
         await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
 
     async def session_getter(self) -> AsyncGenerator[AsyncSession, None]:
         async with self.session_factory() as session:
             yield session
 
+    async def read_session_getter(self) -> AsyncGenerator[AsyncSession, None]:
+        replica = self.pick_replica()
+        if replica is None:
+            async with self.session_factory() as session:
+                yield session
+            return
+
+        async with replica.session_factory() as session:
+            try:
+                yield session
+            except (OSError, OperationalError, InterfaceError):
+                replica.healthy = False
+                log.warning(
+                    "Read replica %s failed, taking it out of rotation", replica.engine.url
+                )
+                raise
+
+    def pick_replica(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next_replica) % len(healthy)]
+
+    def read_session_factory(self) -> async_sessionmaker[AsyncSession]:
+        replica = self.pick_replica()
+        return self.session_factory if replica is None else replica.session_factory
+
+    async def check_replicas(self) -> None:
+        results = await asyncio.gather(
+            *(self._ping(replica.engine) for replica in self.replicas)
+        )
+        for replica, healthy in zip(self.replicas, results):
+            if healthy != replica.healthy:
+                log.warning(
+                    "Read replica %s is %s", replica.engine.url, "up" if healthy else "down"
+                )
+            replica.healthy = healthy
+
+    async def start_health_checks(self) -> None:
+        if self.replicas and self._health_task is None:
+            self._health_task = asyncio.create_task(self._run_health_checks())
+
+    async def stop_health_checks(self) -> None:
+        if self._health_task is None:
+            return
+        self._health_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._health_task
+        self._health_task = None
+
+    async def _ping(self, engine: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self.health_check_timeout):
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+        except (OSError, TimeoutError, SQLAlchemyError):
+            return False
+        return True
+
+    async def _run_health_checks(self) -> None:
+        while True:
+            await self.check_replicas()
+            await asyncio.sleep(self.health_check_interval)
+
+
+def _session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=engine,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+    )
+
 
 db_helper = DataBaseHelper(
     url=str(settings.db.url),
@@ -42,4 +190,7 @@ db_helper = DataBaseHelper(
     echo_pool=settings.db.echo_pool,
     pool_size=settings.db.pool_size,
     max_overflow=settings.db.max_overflow,
+    replica_urls=[str(url) for url in settings.db.replica_urls],
+    health_check_interval=settings.db.replica_health_check_interval,
+    health_check_timeout=settings.db.replica_health_check_timeout,
 )
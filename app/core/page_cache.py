@@ -0,0 +1,154 @@
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+from app.core.http_cache import etag_matches, strong_etag
+
+type PageKey = tuple[str, str, str, tuple[tuple[str, str], ...]]
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    body: bytes
+    status_code: int
+    headers: tuple[tuple[str, str], ...]
+    etag: str
+    expires_at: float
+
+    def to_response(self, if_none_match: str | None, cache_control: str) -> Response:
+        # pages are rendered per locale cookie
+        validators = {"etag": self.etag, "vary": "Cookie", "cache-control": cache_control}
+        if etag_matches(if_none_match, self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            headers=dict(self.headers) | validators,
+        )
+
+
+class PageCache:
+    """In-process LRU cache of rendered HTML pages with per-route TTLs.
+
+    Pages are keyed by base URL, route template, ``locale`` cookie and path
+    parameters, and stored as encoded bytes together with a strong ETag,
+    so a hit skips the endpoint, its queries and template rendering, and a
+    matching ``If-None-Match`` gets a 304. Concurrent misses for the same
+    key wait for a single render instead of rendering in parallel. The
+    cache is bounded both by entry count and by total body size.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._pages: OrderedDict[PageKey, CachedPage] = OrderedDict()
+        self._locks: dict[PageKey, asyncio.Lock] = {}
+
+    def cached(self, ttl: float, cache_control: str):
+        """Cache the endpoint's response for ``ttl`` seconds; it must take a ``request``."""
+
+        def decorator(endpoint: Callable[..., Awaitable[Response]]):
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs) -> Response:
+                request: Request = kwargs["request"]
+                page = await self.get_or_render(
+                    self.key_for(request),
+                    ttl,
+                    lambda: endpoint(*args, **kwargs),
+                )
+                if isinstance(page, Response):
+                    return page
+                return page.to_response(request.headers.get("if-none-match"), cache_control)
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def key_for(request: Request) -> PageKey:
+        route = request.scope["route"]
+        return (
+            str(request.base_url),
+            route.path_format,
+            request.cookies.get("locale", "en"),
+            tuple(sorted(request.path_params.items())),
+        )
+
+    async def get_or_render(
+        self,
+        key: PageKey,
+        ttl: float,
+        render: Callable[[], Awaitable[Response]],
+    ) -> CachedPage | Response:
+        """Cached page for ``key``, or the rendered response if it cannot be cached."""
+        page = self._get(key)
+        if page is not None:
+            return page
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                page = self._get(key)
+                if page is not None:
+                    return page
+
+                response = await render()
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                return self._put(key, response, ttl) or response
+        finally:
+            if not lock.locked() and self._locks.get(key) is lock:
+                del self._locks[key]
+
+    def clear(self) -> None:
+        self._pages.clear()
+        self.size = 0
+
+    def _get(self, key: PageKey) -> CachedPage | None:
+        page = self._pages.get(key)
+        if page is None:
+            return None
+        if page.expires_at <= time.monotonic():
+            self._evict(key)
+            return None
+        self._pages.move_to_end(key)
+        return page
+
+    def _put(self, key: PageKey, response: Response, ttl: float) -> CachedPage | None:
+        body = bytes(response.body)
+        if len(body) > self.max_bytes:
+            return None
+        if key in self._pages:
+            self._evict(key)
+        page = self._pages[key] = CachedPage(
+            body=body,
+            status_code=response.status_code,
+            headers=tuple(
+                (name, value)
+                for name, value in response.headers.items()
+                if name != "content-length"
+            ),
+            etag=strong_etag(body),
+            expires_at=time.monotonic() + ttl,
+        )
+        self.size += len(body)
+        while len(self._pages) > self.max_entries or self.size > self.max_bytes:
+            self._evict(next(iter(self._pages)))
+        return page
+
+    def _evict(self, key: PageKey) -> None:
+        page = self._pages.pop(key)
+        self.size -= len(page.body)
+
+
+page_cache = PageCache(
+    max_entries=settings.page_cache.max_entries,
+    max_bytes=settings.page_cache.max_bytes,
+)
@@ -1,11 +1,38 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from app.core.config import settings
+from app.core.leader import leader_election
+from app.core.metrics import timed_job
 from app.core.models.db_helper import db_helper
+from app.notes.partitions import PARTITION_INTERVALS, PartitionInterval, maintain_partitions
 from app.notes.services import delete_expired_notes
+from app.utils.image_gc import image_gc
 
 
-def start_scheduler():
+def start_scheduler(partition_interval: PartitionInterval | None = None):
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(delete_expired_notes, "interval", minutes=120, args=[db_helper])
+    scheduler.add_job(
+        leader_election.leader_only(timed_job("delete_expired_notes", delete_expired_notes)),
+        "interval",
+        minutes=120,
+        args=[db_helper],
+        # partitions drop their own notes, only strays in notes_default are swept
+        kwargs={"grace": PARTITION_INTERVALS[partition_interval]} if partition_interval else {},
+    )
+    scheduler.add_job(
+        leader_election.leader_only(timed_job("image_gc_reconcile", image_gc.reconcile)),
+        "interval",
+        minutes=settings.images.gc_interval_minutes,
+        args=[db_helper],
+    )
+    if partition_interval is not None:
+        scheduler.add_job(
+            leader_election.leader_only(
+                timed_job("partition_maintenance", maintain_partitions)
+            ),
+            "interval",
+            minutes=settings.notes.partition_maintenance_minutes,
+            args=[db_helper, partition_interval],
+        )
     scheduler.start()
     return scheduler
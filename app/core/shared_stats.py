@@ -0,0 +1,282 @@
+import mmap
+import multiprocessing
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+KEY_SIZE = 128
+HEADER_SIZE = 2
+OVERFLOW_KEY = "<other>"
+UNMATCHED_KEY = "<unmatched>"
+EXCEPTION_STATUS = 999
+
+
+@dataclass
+class PathCounts:
+    count: int = 0
+    statuses_counts: defaultdict[int, int] = field(
+        default_factory=lambda: defaultdict(int)
+    )
+    latency_bounds: tuple[float, ...] = ()
+    latency_buckets: list[int] = field(default_factory=list)
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+
+    def latency_quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile, capped by the max."""
+        total = sum(self.latency_buckets)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, hits in zip(self.latency_bounds, self.latency_buckets):
+            seen += hits
+            if seen >= rank:
+                return min(bound, self.latency_max)
+        return self.latency_max
+
+
+class SharedWorkerRegions:
+    """Anonymous shared mapping split into one int64 region per worker process.
+
+    The mapping is created at import time, i.e. in the gunicorn master
+    before it forks, so every worker sees the same memory. Each worker
+    claims its own region on first use and is the only process writing to
+    it, so updates need no locking; readers aggregate all regions. A region
+    left behind by a dead worker is reused, together with its values, by
+    the next worker that needs one; ``_adopt`` lets subclasses reset what
+    must not carry over. Slot 0 of a region holds the owner pid.
+    """
+
+    def __init__(self, regions: int, region_size: int) -> None:
+        self.regions = regions
+        self.region_size = region_size
+        self._buffer = mmap.mmap(-1, regions * region_size)
+        self._claim_lock = multiprocessing.Lock()
+        self._reset_local()
+        os.register_at_fork(after_in_child=self._reset_local)
+
+    def _reset_local(self) -> None:
+        self._counters: memoryview | None = None
+
+    def _claim_region(self) -> int:
+        pid = os.getpid()
+        with self._claim_lock:
+            for region in range(self.regions):
+                counters = self._region_counters(region)
+                owner = counters[0]
+                if owner == pid or owner == 0 or not _is_alive(owner):
+                    if owner not in (pid, 0):
+                        self._adopt(counters)
+                    counters[0] = pid
+                    break
+            else:
+                raise RuntimeError("No free shared stats region left")
+        self._counters = counters
+        return region
+
+    def _adopt(self, counters: memoryview) -> None:
+        """Called with the lock held when taking over a dead worker's region."""
+
+    def _claimed_regions(self, live_only: bool = False) -> list[int]:
+        regions = []
+        for region in range(self.regions):
+            owner = self._region_counters(region)[0]
+            if owner and (not live_only or _is_alive(owner)):
+                regions.append(region)
+        return regions
+
+    def _region_view(self, region: int) -> memoryview:
+        start = region * self.region_size
+        return memoryview(self._buffer)[start : start + self.region_size]
+
+    def _region_counters(self, region: int) -> memoryview:
+        return self._region_view(region)[: self.region_size // 8 * 8].cast("q")
+
+
+class SharedRequestStats(SharedWorkerRegions):
+    """Per-route request counters and latency histograms for all workers.
+
+    Region layout, int64 slots except for the key area:
+    ``[pid, used_keys]`` header, ``max_keys`` rows of
+    ``[count, bucket hits * len(buckets) + 1, sum_us, max_us,
+    (status, hits) * max_statuses]`` and ``max_keys`` fixed-size utf-8 keys.
+    The last row is reserved for ``OVERFLOW_KEY``.
+    """
+
+    def __init__(
+        self,
+        regions: int,
+        max_keys: int,
+        max_statuses: int,
+        buckets: Sequence[float],
+    ) -> None:
+        self.max_keys = max_keys
+        self.max_statuses = max_statuses
+        self.bounds = (*buckets, float("inf"))
+        self._sum_offset = 1 + len(self.bounds)
+        self._statuses_offset = self._sum_offset + 2
+        self.row_size = self._statuses_offset + 2 * max_statuses
+        self.counters_size = HEADER_SIZE + max_keys * self.row_size
+        super().__init__(
+            regions=regions,
+            region_size=self.counters_size * 8 + max_keys * KEY_SIZE,
+        )
+
+    def record(self, key: str, status_code: int, seconds: float) -> None:
+        counters = self._counters
+        if counters is None:
+            self._claim_region()
+            counters = self._counters
+        row = self._rows.get(key)
+        if row is None:
+            row = self._add_key(key)
+
+        start = HEADER_SIZE + row * self.row_size
+        counters[start] += 1
+        counters[start + 1 + bisect_left(self.bounds, seconds)] += 1
+        micros = int(seconds * 1_000_000)
+        counters[start + self._sum_offset] += micros
+        if micros > counters[start + self._sum_offset + 1]:
+            counters[start + self._sum_offset + 1] = micros
+
+        statuses_start = start + self._statuses_offset
+        for index in range(statuses_start, statuses_start + 2 * self.max_statuses, 2):
+            if counters[index] == status_code:
+                counters[index + 1] += 1
+                return
+            if counters[index] == 0:
+                counters[index] = status_code
+                counters[index + 1] = 1
+                return
+
+    def snapshot(self) -> dict[str, PathCounts]:
+        """Aggregate the counters of every worker, past and present."""
+        stats = defaultdict[str, PathCounts](
+            lambda: PathCounts(
+                latency_bounds=self.bounds, latency_buckets=[0] * len(self.bounds)
+            )
+        )
+        for region in self._claimed_regions():
+            counters = self._region_counters(region)
+            keys = self._region_keys(region)
+            rows = [(row, self._read_key(keys, row)) for row in range(counters[1])]
+            if counters[HEADER_SIZE + (self.max_keys - 1) * self.row_size]:
+                rows.append((self.max_keys - 1, OVERFLOW_KEY))
+            for row, key in rows:
+                start = HEADER_SIZE + row * self.row_size
+                path_counts = stats[key]
+                path_counts.count += counters[start]
+                for bucket in range(len(self.bounds)):
+                    path_counts.latency_buckets[bucket] += counters[start + 1 + bucket]
+                path_counts.latency_sum += counters[start + self._sum_offset] / 1_000_000
+                path_counts.latency_max = max(
+                    path_counts.latency_max,
+                    counters[start + self._sum_offset + 1] / 1_000_000,
+                )
+                statuses_start = start + self._statuses_offset
+                for index in range(statuses_start, start + self.row_size, 2):
+                    if counters[index] == 0:
+                        break
+                    path_counts.statuses_counts[counters[index]] += counters[index + 1]
+        return dict(stats)
+
+    def _reset_local(self) -> None:
+        super()._reset_local()
+        self._keys: memoryview | None = None
+        self._rows: dict[str, int] = {}
+
+    def _claim_region(self) -> int:
+        region = super()._claim_region()
+        self._keys = self._region_keys(region)
+        self._rows = {
+            self._read_key(self._keys, row): row for row in range(self._counters[1])
+        }
+        return region
+
+    def _add_key(self, key: str) -> int:
+        used = self._counters[1]
+        if used >= self.max_keys - 1:
+            return self.max_keys - 1
+        self._write_key(used, key)
+        self._counters[1] = used + 1
+        self._rows[key] = used
+        return used
+
+    def _region_keys(self, region: int) -> memoryview:
+        return self._region_view(region)[self.counters_size * 8 :]
+
+    def _write_key(self, row: int, key: str) -> None:
+        encoded = key.encode()[:KEY_SIZE]
+        self._keys[row * KEY_SIZE : row * KEY_SIZE + len(encoded)] = encoded
+
+    @staticmethod
+    def _read_key(keys: memoryview, row: int) -> str:
+        raw = bytes(keys[row * KEY_SIZE : (row + 1) * KEY_SIZE])
+        return raw.rstrip(b"\0").decode(errors="replace")
+
+
+class SharedMetrics(SharedWorkerRegions):
+    """Fixed set of int64 counters and gauges for all workers.
+
+    Slots are addressed by index, so recording is a single in-place add or
+    store with no lookups. Counters are summed over every region, gauges
+    only over the regions of live workers. The ``gauges`` slots are zeroed
+    when a region is taken over, so a replacement worker does not report
+    its dead predecessor's values.
+    """
+
+    def __init__(self, regions: int, size: int, gauges: tuple[int, ...] = ()) -> None:
+        self.size = size
+        self.gauges = gauges
+        super().__init__(regions=regions, region_size=(1 + size) * 8)
+
+    def inc(self, index: int, value: int = 1) -> None:
+        counters = self._counters
+        if counters is None:
+            self._claim_region()
+            counters = self._counters
+        counters[1 + index] += value
+
+    def set(self, index: int, value: int) -> None:
+        counters = self._counters
+        if counters is None:
+            self._claim_region()
+            counters = self._counters
+        counters[1 + index] = value
+
+    def totals(self, live_only: bool = False) -> list[int]:
+        totals = [0] * self.size
+        for region in self._claimed_regions(live_only=live_only):
+            counters = self._region_counters(region)
+            for index in range(self.size):
+                totals[index] += counters[1 + index]
+        return totals
+
+    def marked_values(self, marker: int) -> list[int]:
+        """Slots of the live worker that stored its own pid in ``marker``, zeros if none did.
+
+        Lets one worker, e.g. the scheduler leader, publish values that are
+        reported as is instead of summed over the workers.
+        """
+        for region in self._claimed_regions(live_only=True):
+            counters = self._region_counters(region)
+            if counters[1 + marker] == counters[0]:
+                return list(counters[1 : 1 + self.size])
+        return [0] * self.size
+
+    def _adopt(self, counters: memoryview) -> None:
+        for index in self.gauges:
+            counters[1 + index] = 0
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -1,3 +1,25 @@
+import logging
+
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from app.core.assets import asset_url
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
 
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
+# shared by all workers; files are written atomically
+templates.env.bytecode_cache = FileSystemBytecodeCache(
+    settings.templates.bytecode_cache_dir
+)
+
+
+def precompile_templates() -> int:
+    """Load every template so the first request does not compile it."""
+    names = templates.env.list_templates()
+    for name in names:
+        templates.env.get_template(name)
+    log.info("Precompiled %d templates", len(names))
+    return len(names)
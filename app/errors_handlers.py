@@ -2,10 +2,11 @@ import logging
 
 from fastapi import FastAPI, Request, status
 from fastapi.responses import ORJSONResponse
-from fastapi_babel import _
 from pydantic import ValidationError
 from sqlalchemy.exc import DatabaseError
 
+from app.localization import _
+
 log = logging.getLogger(__name__)
 
 
@@ -1,4 +1,10 @@
+import gettext
+from collections.abc import Callable
+from pathlib import Path
+
+from fastapi import Request
 from fastapi_babel import Babel, BabelConfigs
+from fastapi_babel.local_context import context_var
 
 from app.core.templates import templates
 
@@ -9,4 +15,43 @@ babel_configs = BabelConfigs(
 )
 
 babel = Babel(babel_configs)
-babel.install_jinja(templates)
+
+
+class LocaleCatalogs:
+    """gettext catalogs for every locale in the translation directory.
+
+    Catalogs are loaded once, so a request only looks up its locale
+    instead of searching for and parsing ``.mo`` files. Unknown locales
+    get the default one.
+    """
+
+    def __init__(self, configs: BabelConfigs) -> None:
+        self.default_locale = configs.BABEL_DEFAULT_LOCALE
+        self.default = gettext.NullTranslations().gettext
+        directory = Path(configs.BABEL_TRANSLATION_DIRECTORY)
+        self.catalogs: dict[str, Callable[[str], str]] = {
+            path.name: gettext.translation(
+                babel.domain, directory, [path.name], fallback=True
+            ).gettext
+            for path in directory.iterdir()
+            if path.is_dir() and path.name != self.default_locale
+        }
+
+    def gettext(self, locale: str) -> Callable[[str], str]:
+        return self.catalogs.get(locale, self.default)
+
+
+catalogs = LocaleCatalogs(babel_configs)
+
+
+def _(message: str) -> str:
+    """Translate ``message`` for the current request; untranslated outside localized routes."""
+    return context_var.get(catalogs.default)(message)
+
+
+async def set_locale(request: Request) -> None:
+    """Router dependency that selects the catalog from the ``locale`` cookie."""
+    context_var.set(catalogs.gettext(request.cookies.get("locale", catalogs.default_locale)))
+
+
+templates.env.globals["_"] = _
@@ -1,25 +1,56 @@
-import logging
-
 import uvicorn
-from fastapi.staticfiles import StaticFiles
 
 from app.admin.admin_panel import setup_admin
 from app.api.router import router as api_router
+from app.core.assets import ASSETS_DIR, MANIFEST_NAME, assets
 from app.core.config import settings
+from app.core.http_cache import HashedStaticFiles
+from app.core.logs import setup_logging
 from app.create_fastapi_app import create_app
 from app.localization import babel
 from app.middlewares import setup_middleware
+from app.utils.downloading_pictures import IMAGES_DIR
 
-logging.basicConfig(
-    level=settings.logging.log_level,
-    format=settings.logging.log_format,
-)
+setup_logging()
 
 main_app = create_app(
     create_custom_static_urls=True,
 )
 
-main_app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# built before gunicorn forks its workers
+assets.build()
+
+main_app.mount(
+    "/static/dist",
+    HashedStaticFiles(
+        directory=ASSETS_DIR,
+        cache_control=settings.page_cache.asset_cache_control,
+        # not fingerprinted, so it must not be cached as immutable
+        hidden=(MANIFEST_NAME,),
+    ),
+    name="assets",
+)
+
+# uploaded note images must not outlive their note in shared caches
+main_app.mount(
+    "/static/images",
+    HashedStaticFiles(
+        directory=IMAGES_DIR,
+        check_dir=False,
+        cache_control=settings.page_cache.images_cache_control,
+        content_etags=False,
+    ),
+    name="images",
+)
+
+main_app.mount(
+    "/static",
+    HashedStaticFiles(
+        directory="app/static",
+        cache_control=settings.page_cache.static_cache_control,
+    ),
+    name="static",
+)
 
 setup_admin(
     main_app,
@@ -36,4 +67,5 @@ if __name__ == "__main__":
         host=settings.run.host,
         port=settings.run.port,
         reload=True,
+        access_log=False,
     )
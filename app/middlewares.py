@@ -1,16 +1,24 @@
 import logging
+import random
 import time
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_babel import BabelMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.core.types.call_next import CallNext
-from app.localization import babel_configs
-from app.requests_count_middleware import requests_count_middleware_dispatch
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.logs import ACCESS_LOGGER_NAME
+from app.core.shared_stats import EXCEPTION_STATUS
+from app.errors_handlers import error_response
+from app.requests_count_middleware import (
+    RequestsCountMiddleware,
+    requests_stats,
+    route_key,
+)
 
-log = logging.getLogger(__name__)
+access_log = logging.getLogger(ACCESS_LOGGER_NAME)
 
 ALLOW_ORIGINS = [
     "https://localhost",
@@ -18,30 +26,129 @@ ALLOW_ORIGINS = [
 ]
 
 
-class ProcessTimeHeaderMiddleware(BaseHTTPMiddleware):
-    def __init__(self, *args, process_time_header_name: str, **kwargs):
-        super().__init__(*args, **kwargs)
+class ProcessTimeHeaderMiddleware:
+    def __init__(self, app: ASGIApp, process_time_header_name: str):
+        self.app = app
         self.header_name = process_time_header_name
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: CallNext
-    ) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         start_time = time.perf_counter()
-        response = await call_next(request)
-        process_time = time.perf_counter() - start_time
-        response.headers[self.header_name] = f"{process_time:.5f}s"
-        return response
 
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                headers = MutableHeaders(scope=message)
+                headers[self.header_name] = f"{process_time:.5f}s"
+            await send(message)
 
-def setup_middleware(app: FastAPI) -> None:
+        await self.app(scope, receive, send_wrapper)
 
-    app.add_middleware(
-        BabelMiddleware,
-        babel_configs=babel_configs,
-        locale_selector=lambda request: request.cookies.get("locale", "en"),
-    )
+
+class FormSizeLimitMiddleware:
+    """Rejects multipart bodies larger than ``max_size`` before they are parsed.
+
+    Starlette spools a whole upload to a temporary file while parsing the
+    form, before the endpoint and its image size check run. A declared
+    ``Content-Length`` over the limit is answered with 413 without reading
+    the body; bodies sent without one are counted as they arrive.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        headers = Headers(scope=scope)
+        if scope["type"] != "http" or not headers.get("content-type", "").startswith(
+            "multipart/form-data"
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_size:
+            response = error_response(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "Request is too large"
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    # passed through by FastAPI's body parsing as is
+                    raise HTTPException(
+                        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "Request is too large"
+                    )
+            return message
+
+        await self.app(scope, receive_wrapper, send)
+
+
+class AccessLogMiddleware:
+    """Writes one structured access line per request once it has finished.
+
+    Requests are identified by route template, so note text from the path
+    never ends up in the logs. Successful responses are sampled at
+    ``sample_rate``; errors are always logged.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        start_time = time.perf_counter()
+        status_code = EXCEPTION_STATUS
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status_code >= 400 or random.random() < self.sample_rate:
+                self._log(scope, root_path, status_code, time.perf_counter() - start_time)
+
+    @staticmethod
+    def _log(scope: Scope, root_path: str, status_code: int, seconds: float) -> None:
+        route = route_key(scope, root_path)
+        access_log.log(
+            logging.INFO if status_code < 500 else logging.ERROR,
+            "%s %s %s",
+            scope["method"],
+            route,
+            status_code,
+            extra={
+                "fields": {
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status_code,
+                    "duration_ms": round(seconds * 1000, 3),
+                    "http_version": scope.get("http_version"),
+                }
+            },
+        )
+
+
+def setup_middleware(app: FastAPI) -> None:
 
     app.add_middleware(
         CORSMiddleware,
@@ -50,20 +157,30 @@ def setup_middleware(app: FastAPI) -> None:
         allow_headers=["*"],
     )
 
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression.minimum_size,
+        gzip_level=settings.compression.gzip_level,
+        brotli_quality=settings.compression.brotli_quality,
+        zstd_level=settings.compression.zstd_level,
+    )
+
+    app.add_middleware(
+        FormSizeLimitMiddleware,
+        max_size=settings.images.max_form_bytes,
+    )
+
     app.add_middleware(
         ProcessTimeHeaderMiddleware,
         process_time_header_name="X-Process-Time",
     )
 
     app.add_middleware(
-        BaseHTTPMiddleware,
-        dispatch=requests_count_middleware_dispatch,
+        RequestsCountMiddleware,
+        stats=requests_stats,
     )
 
-    @app.middleware("http")
-    async def log_new_requests(
-        request: Request,
-        call_next: CallNext,
-    ) -> Response:
-        log.info("Request %s to %s", request.method, request.url.path)
-        return await call_next(request)
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=settings.logging.access_log_sample_rate,
+    )
@@ -40,7 +40,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
     with context.begin_transaction():
         context.run_migrations()
 
@@ -53,9 +57,9 @@ async def run_async_migrations():
     # Create an async engine
     engine = create_async_engine(db_url)
 
-    # Connect to the database
-    async with engine.begin() as connection:
-        # Run migrations inside a transaction
+    # Connect to the database; each migration manages its own transaction,
+    # so revisions may use autocommit blocks (e.g. CREATE INDEX CONCURRENTLY)
+    async with engine.connect() as connection:
         await connection.run_sync(do_run_migrations)
 
     # Close the engine
@@ -0,0 +1,65 @@
+"""Add unique index on notes.note_hash
+
+Revision ID: 24ebe91004bc
+Revises: 23308458fdbb
+Create Date: 2026-10-18 10:12:41.204117
+
+"""
+
+import logging
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "24ebe91004bc"
+down_revision: Union[str, None] = "23308458fdbb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    # the same text + secret always hashes to the same id, so older rows may
+    # collide; keep the newest copy of each note before enforcing uniqueness
+    removed = op.get_bind().execute(
+        sa.text(
+            "DELETE FROM notes AS older USING notes AS newer "
+            "WHERE older.note_hash = newer.note_hash AND older.id < newer.id "
+            "RETURNING older.id, older.image"
+        )
+    ).all()
+    if removed:
+        log.warning(
+            "Removed %d duplicate notes (ids %s) before adding the unique index",
+            len(removed),
+            ", ".join(str(row.id) for row in removed),
+        )
+        # no note references them any more, so the image GC reconcile job deletes them
+        images = sorted({row.image for row in removed if row.image})
+        if images:
+            log.warning(
+                "Left %d orphaned images to the image GC: %s", len(images), ", ".join(images)
+            )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_notes_note_hash"),
+            "notes",
+            ["note_hash"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f("ix_notes_note_hash"),
+            table_name="notes",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
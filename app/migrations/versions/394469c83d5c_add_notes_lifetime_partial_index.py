@@ -0,0 +1,41 @@
+"""Add partial index on notes.lifetime
+
+Revision ID: 394469c83d5c
+Revises: ece5b44db4b4
+Create Date: 2026-10-18 12:41:09.771253
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "394469c83d5c"
+down_revision: Union[str, None] = "ece5b44db4b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_notes_lifetime",
+            "notes",
+            ["lifetime"],
+            unique=False,
+            postgresql_where=sa.text("lifetime IS NOT NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_notes_lifetime",
+            table_name="notes",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
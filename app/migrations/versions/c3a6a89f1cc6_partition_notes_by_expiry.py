@@ -0,0 +1,193 @@
+"""Optionally partition notes by expiry bucket
+
+Only applied when requested explicitly with
+``alembic -x partition_interval=hour|day upgrade head``; otherwise this
+revision is a no-op. To switch an existing database later, downgrade to
+394469c83d5c and upgrade again with the option. The chosen interval is
+stored in the table comment, which is what the app reads at startup.
+
+The partitioned table has no primary key or unique index (they cannot
+cover the expression partition key): ids rely on the sequence and
+note_hash uniqueness on the notes_unique_note_hash trigger. The ORM
+model still declares both, so autogenerate will report them as missing.
+
+Revision ID: c3a6a89f1cc6
+Revises: 394469c83d5c
+Create Date: 2026-10-18 13:40:12.184305
+
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision: str = "c3a6a89f1cc6"
+down_revision: Union[str, None] = "394469c83d5c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# inlined so later changes to the app cannot change this revision
+INTERVALS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+NAME_FORMATS = {"hour": "%Y%m%d%H", "day": "%Y%m%d"}
+PARTITIONS_AHEAD = 7
+PARTITION_KEY = "COALESCE(lifetime, 'infinity'::timestamptz)"
+
+NOTE_COLUMNS = "text, secret, note_hash, is_ephemeral, lifetime, image, id"
+COUNTER_TRIGGERS = (
+    "CREATE TRIGGER note_counters_insert AFTER INSERT ON notes "
+    "REFERENCING NEW TABLE AS inserted_notes "
+    "FOR EACH STATEMENT EXECUTE FUNCTION note_counters_on_insert()",
+    "CREATE TRIGGER note_counters_delete AFTER DELETE ON notes "
+    "REFERENCING OLD TABLE AS deleted_notes "
+    "FOR EACH STATEMENT EXECUTE FUNCTION note_counters_on_delete()",
+    "CREATE TRIGGER note_counters_truncate AFTER TRUNCATE ON notes "
+    "FOR EACH STATEMENT EXECUTE FUNCTION note_counters_on_truncate()",
+)
+
+
+def _create_notes_table(
+    name: str, sequence: str, constraints: str = "", options: str = ""
+) -> None:
+    op.execute(
+        f"""
+        CREATE TABLE {name} (
+            text VARCHAR NOT NULL,
+            secret VARCHAR NOT NULL,
+            note_hash VARCHAR NOT NULL,
+            is_ephemeral BOOLEAN NOT NULL,
+            lifetime TIMESTAMP WITH TIME ZONE,
+            image VARCHAR,
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'::regclass)
+            {constraints}
+        ) {options}
+        """
+    )
+
+
+def _upcoming_partitions(interval: str) -> list[tuple[str, datetime, datetime]]:
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if interval == "day":
+        start = start.replace(hour=0)
+    step = INTERVALS[interval]
+    buckets = [start + step * i for i in range(PARTITIONS_AHEAD + 1)]
+    return [
+        ("notes_p" + bucket.strftime(NAME_FORMATS[interval]), bucket, bucket + step)
+        for bucket in buckets
+    ]
+
+
+def _is_partitioned() -> bool:
+    return op.get_bind().scalar(
+        sa.text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = 'notes'::regclass)"
+        )
+    )
+
+
+def _replace_notes_table(new_table: str, sequence: str) -> None:
+    op.execute(f"INSERT INTO {new_table} ({NOTE_COLUMNS}) SELECT {NOTE_COLUMNS} FROM notes")
+    # drops the old indexes and triggers with it
+    op.execute("DROP TABLE notes")
+    op.execute(f"ALTER TABLE {new_table} RENAME TO notes")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY notes.id")
+
+
+def upgrade() -> None:
+    interval = context.get_x_argument(as_dictionary=True).get("partition_interval")
+    if interval is None:
+        return
+    if interval not in INTERVALS:
+        raise ValueError(f"partition_interval must be one of {', '.join(INTERVALS)}")
+
+    sequence = op.get_bind().scalar(sa.text("SELECT pg_get_serial_sequence('notes', 'id')"))
+    op.execute("LOCK TABLE notes IN ACCESS EXCLUSIVE MODE")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+
+    # unique constraints cannot cover an expression partition key, so ids
+    # rely on the sequence and note_hash on the trigger below
+    _create_notes_table(
+        "notes_partitioned", sequence, options=f"PARTITION BY RANGE (({PARTITION_KEY}))"
+    )
+    op.execute(
+        "CREATE TABLE notes_forever PARTITION OF notes_partitioned "
+        "FOR VALUES FROM ('infinity') TO (MAXVALUE)"
+    )
+    op.execute("CREATE TABLE notes_default PARTITION OF notes_partitioned DEFAULT")
+    for name, start, end in _upcoming_partitions(interval):
+        op.execute(
+            f"CREATE TABLE {name} PARTITION OF notes_partitioned "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    _replace_notes_table("notes_partitioned", sequence)
+    op.execute(f"COMMENT ON TABLE notes IS 'partition_interval={interval}'")
+
+    op.create_index("ix_notes_id", "notes", ["id"], unique=False)
+    op.create_index(op.f("ix_notes_note_hash"), "notes", ["note_hash"], unique=False)
+    op.create_index(
+        "ix_notes_lifetime",
+        "notes",
+        ["lifetime"],
+        unique=False,
+        postgresql_where=sa.text("lifetime IS NOT NULL"),
+    )
+    op.execute(
+        """
+        CREATE FUNCTION notes_unique_note_hash() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            -- serializes writes of the same hash, whichever partition they go to
+            PERFORM pg_advisory_xact_lock('notes'::regclass::oid::int, hashtext(NEW.note_hash));
+            -- a row moved to another partition by an UPDATE keeps its id
+            IF EXISTS (
+                SELECT 1 FROM notes WHERE note_hash = NEW.note_hash AND id <> NEW.id
+            ) THEN
+                RAISE unique_violation USING
+                    MESSAGE = 'duplicate key value violates unique constraint "ix_notes_note_hash"',
+                    CONSTRAINT = 'ix_notes_note_hash';
+            END IF;
+            RETURN NEW;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER notes_unique_note_hash BEFORE INSERT ON notes "
+        "FOR EACH ROW EXECUTE FUNCTION notes_unique_note_hash()"
+    )
+    op.execute(
+        "CREATE TRIGGER notes_unique_note_hash_update BEFORE UPDATE OF note_hash ON notes "
+        "FOR EACH ROW WHEN (OLD.note_hash IS DISTINCT FROM NEW.note_hash) "
+        "EXECUTE FUNCTION notes_unique_note_hash()"
+    )
+    # the counter is unchanged, the rows were copied before the triggers existed
+    for trigger in COUNTER_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade() -> None:
+    if not _is_partitioned():
+        return
+
+    sequence = op.get_bind().scalar(sa.text("SELECT pg_get_serial_sequence('notes', 'id')"))
+    op.execute("LOCK TABLE notes IN ACCESS EXCLUSIVE MODE")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    _create_notes_table(
+        "notes_unpartitioned", sequence, constraints=", CONSTRAINT notes_pkey PRIMARY KEY (id)"
+    )
+    _replace_notes_table("notes_unpartitioned", sequence)
+    op.execute("DROP FUNCTION IF EXISTS notes_unique_note_hash()")
+
+    op.create_index(op.f("ix_notes_note_hash"), "notes", ["note_hash"], unique=True)
+    op.create_index(
+        "ix_notes_lifetime",
+        "notes",
+        ["lifetime"],
+        unique=False,
+        postgresql_where=sa.text("lifetime IS NOT NULL"),
+    )
+    for trigger in COUNTER_TRIGGERS:
+        op.execute(trigger)
@@ -0,0 +1,91 @@
+"""Add trigger-maintained note counter
+
+Revision ID: ece5b44db4b4
+Revises: 24ebe91004bc
+Create Date: 2026-10-18 11:03:27.518930
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "ece5b44db4b4"
+down_revision: Union[str, None] = "24ebe91004bc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "note_counters",
+        sa.Column("total", sa.BigInteger(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("LOCK TABLE notes IN SHARE MODE")
+    op.execute("INSERT INTO note_counters (id, total) SELECT 1, count(*) FROM notes")
+
+    op.execute(
+        """
+        CREATE FUNCTION note_counters_on_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE note_counters
+            SET total = total + (SELECT count(*) FROM inserted_notes)
+            WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION note_counters_on_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE note_counters
+            SET total = total - (SELECT count(*) FROM deleted_notes)
+            WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION note_counters_on_truncate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE note_counters SET total = 0 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER note_counters_insert AFTER INSERT ON notes "
+        "REFERENCING NEW TABLE AS inserted_notes "
+        "FOR EACH STATEMENT EXECUTE FUNCTION note_counters_on_insert()"
+    )
+    op.execute(
+        "CREATE TRIGGER note_counters_delete AFTER DELETE ON notes "
+        "REFERENCING OLD TABLE AS deleted_notes "
+        "FOR EACH STATEMENT EXECUTE FUNCTION note_counters_on_delete()"
+    )
+    op.execute(
+        "CREATE TRIGGER note_counters_truncate AFTER TRUNCATE ON notes "
+        "FOR EACH STATEMENT EXECUTE FUNCTION note_counters_on_truncate()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS note_counters_truncate ON notes")
+    op.execute("DROP TRIGGER IF EXISTS note_counters_delete ON notes")
+    op.execute("DROP TRIGGER IF EXISTS note_counters_insert ON notes")
+    op.execute("DROP FUNCTION IF EXISTS note_counters_on_truncate()")
+    op.execute("DROP FUNCTION IF EXISTS note_counters_on_delete()")
+    op.execute("DROP FUNCTION IF EXISTS note_counters_on_insert()")
+    op.drop_table("note_counters")
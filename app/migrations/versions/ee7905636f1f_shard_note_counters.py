@@ -0,0 +1,86 @@
+"""Shard the note counter over several rows
+
+Every statement on notes updated the single note_counters row and held
+its lock until commit, serializing all writers on it. The triggers now
+add to one of SLOTS rows picked at random; readers sum them.
+
+Revision ID: ee7905636f1f
+Revises: c3a6a89f1cc6
+Create Date: 2026-10-19 09:12:44.301275
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "ee7905636f1f"
+down_revision: Union[str, None] = "c3a6a89f1cc6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SLOTS = 16
+
+
+def _replace_delta_functions(slot: str) -> None:
+    for name, sign, transition in (
+        ("note_counters_on_insert", "+", "inserted_notes"),
+        ("note_counters_on_delete", "-", "deleted_notes"),
+    ):
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION {name}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            DECLARE
+                slot integer := {slot};
+            BEGIN
+                UPDATE note_counters
+                SET total = total {sign} (SELECT count(*) FROM {transition})
+                WHERE id = slot;
+                RETURN NULL;
+            END;
+            $$
+            """
+        )
+
+
+def upgrade() -> None:
+    op.execute(
+        f"INSERT INTO note_counters (id, total) "
+        f"SELECT slot, 0 FROM generate_series(2, {SLOTS}) AS slot "
+        f"ON CONFLICT (id) DO NOTHING"
+    )
+    # picked once per statement, so concurrent writers rarely share a row
+    _replace_delta_functions(f"1 + floor(random() * {SLOTS})::integer")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION note_counters_on_truncate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE note_counters SET total = 0;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    _replace_delta_functions("1")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION note_counters_on_truncate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE note_counters SET total = 0 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    op.execute("LOCK TABLE note_counters IN EXCLUSIVE MODE")
+    op.execute(
+        "UPDATE note_counters SET total = (SELECT sum(total) FROM note_counters) WHERE id = 1"
+    )
+    op.execute("DELETE FROM note_counters WHERE id <> 1")
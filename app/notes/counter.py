@@ -0,0 +1,64 @@
+import time
+from typing import Literal
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.notes.models import Note, NoteCounter
+
+type NoteCountMode = Literal["counter", "exact", "estimated"]
+
+# a partitioned notes table keeps no rows itself, its partitions hold the statistics
+ESTIMATED_COUNT_QUERY = text(
+    """
+    SELECT CASE WHEN c.relkind = 'p' THEN (
+        SELECT COALESCE(sum(GREATEST(part.reltuples, 0)), 0)
+        FROM pg_inherits i
+        JOIN pg_class part ON part.oid = i.inhrelid
+        WHERE i.inhparent = c.oid
+    ) ELSE c.reltuples END::bigint
+    FROM pg_class c
+    WHERE c.oid = 'notes'::regclass
+    """
+)
+
+
+class NotesCounter:
+    """Number of stored notes with a short-lived in-process cache.
+
+    ``counter`` sums the trigger-maintained ``note_counters`` slots, ``exact``
+    runs a full ``COUNT(*)`` and ``estimated`` reads the planner statistics,
+    summed over the partitions when ``notes`` is partitioned.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._cache: dict[str, tuple[float, int]] = {}
+
+    async def get(self, db: AsyncSession, mode: NoteCountMode = "counter") -> int:
+        now = time.monotonic()
+        cached = self._cache.get(mode)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        total = max(await self._fetch(db, mode) or 0, 0)
+        self._cache[mode] = (now + self.ttl, total)
+        return total
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    @staticmethod
+    async def _fetch(db: AsyncSession, mode: NoteCountMode) -> int | None:
+        match mode:
+            case "counter":
+                return await db.scalar(select(func.sum(NoteCounter.total)))
+            case "exact":
+                return await db.scalar(select(func.count()).select_from(Note))
+            case "estimated":
+                return await db.scalar(ESTIMATED_COUNT_QUERY)
+        raise ValueError(f"Unknown note count mode: {mode}")
+
+
+notes_counter = NotesCounter(ttl=settings.notes.count_cache_ttl)
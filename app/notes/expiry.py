@@ -0,0 +1,196 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Integer, any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.core.config import settings
+from app.core.leader import LeaderElection, leader_election
+from app.core.metrics import Metric, metrics
+from app.core.models.db_helper import DataBaseHelper, db_helper
+from app.notes.models import Note
+from app.utils.image_gc import image_gc
+
+log = logging.getLogger(__name__)
+
+
+class ExpiryEngine:
+    """Deletes notes close to their exact lifetime instead of on a fixed interval.
+
+    Upcoming deadlines within ``horizon`` are kept in a min-heap that is
+    seeded from the database and refreshed every half horizon; notes
+    created by this worker are pushed as they are written. A seed loads
+    at most ``seed_limit`` of the earliest deadlines; when it is capped,
+    the window ends at the last loaded deadline and the next seed follows
+    as soon as those are handled, so a backlog is drained in chunks. The engine
+    sleeps until the earliest deadline and deletes due notes in small
+    batches. Only the elected leader runs it, so workers never race to
+    delete the same rows; the others keep no deadlines. To learn about
+    notes they create, the leader polls every ``poll_interval`` for
+    deadlines due before its next poll, so those are handled at most one
+    interval late instead of waiting for the next reseed.
+    """
+
+    def __init__(
+        self,
+        db_helper: DataBaseHelper,
+        horizon: timedelta,
+        batch_size: int,
+        seed_limit: int,
+        poll_interval: timedelta,
+        leader: LeaderElection,
+    ) -> None:
+        self.db_helper = db_helper
+        self.leader = leader
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.seed_limit = seed_limit
+        self.poll_interval = poll_interval
+        self._heap: list[tuple[datetime, int]] = []
+        self._seeded_until: datetime | None = None
+        self._capped = False
+        self._poll_at: datetime | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, note_id: int, lifetime: datetime) -> None:
+        if self._task is None or self._seeded_until is None:
+            return
+        if lifetime > self._seeded_until:
+            # picked up by a later reseed, keeps the heap bounded by the horizon
+            return
+        heapq.heappush(self._heap, (lifetime, note_id))
+        if self._heap[0] == (lifetime, note_id):
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self.leader.is_leader:
+            await self.seed()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def seed(self) -> None:
+        now = datetime.now(timezone.utc)
+        seeded_until = now + self.horizon
+        rows = await self._load(seeded_until)
+        self._capped = len(rows) == self.seed_limit
+        if self._capped:
+            seeded_until = rows[-1].lifetime
+        self._seeded_until = seeded_until
+        self._poll_at = now + self.poll_interval
+
+    async def poll(self) -> None:
+        """Load deadlines due before the next poll, e.g. of notes other workers created."""
+        now = datetime.now(timezone.utc)
+        await self._load(now + self.poll_interval)
+        self._poll_at = now + self.poll_interval
+
+    async def _load(self, until: datetime) -> list:
+        async with self.db_helper.session_factory() as session:
+            result = await session.execute(
+                select(Note.lifetime, Note.id)
+                .where(Note.lifetime.isnot(None), Note.lifetime <= until)
+                .order_by(Note.lifetime)
+                .limit(self.seed_limit)
+            )
+            rows = list(result)
+        # keep deadlines pushed while the query was running, skip known ones
+        heap = list({(row.lifetime, row.id) for row in rows}.union(self._heap))
+        heapq.heapify(heap)
+        self._heap = heap
+        return rows
+
+    def pop_due(self, now: datetime) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    async def expire(self, note_ids: list[int]) -> list[str]:
+        """Delete the given notes if they are still expired; returns freed image names."""
+        async with self.db_helper.session_factory() as session:
+            result = await session.execute(
+                delete(Note)
+                .where(
+                    Note.id == any_(bindparam("note_ids", note_ids, type_=ARRAY(Integer))),
+                    Note.lifetime <= func.now(),
+                )
+                .returning(Note.id, Note.image)
+            )
+            rows = result.all()
+            await session.commit()
+        metrics.inc(Metric.NOTES_EXPIRED, len(rows))
+        log.debug("Expired %d of %d due notes", len(rows), len(note_ids))
+        return [row.image for row in rows if row.image]
+
+    def next_wakeup(self, now: datetime) -> float:
+        refresh_at = min(self._reseed_at(), self._poll_at)
+        deadline = min(self._heap[0][0], refresh_at) if self._heap else refresh_at
+        return max((deadline - now).total_seconds(), 0.0)
+
+    def _reseed_at(self) -> datetime:
+        if not self._capped:
+            return self._seeded_until - self.horizon / 2
+        # the rest of a capped window is loaded once the loaded part is handled
+        if self._heap:
+            return datetime.max.replace(tzinfo=timezone.utc)
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not self.leader.is_leader:
+                    self._heap = []
+                    self._seeded_until = None
+                    await asyncio.sleep(self.leader.interval)
+                    continue
+
+                now = datetime.now(timezone.utc)
+                if self._seeded_until is None or now >= self._reseed_at():
+                    await self.seed()
+                elif now >= self._poll_at:
+                    await self.poll()
+                due = self.pop_due(now)
+                if due:
+                    image_gc.discard(await self.expire(due))
+                    continue
+
+                self._wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    # wake up to notice a lost leadership
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        min(self.next_wakeup(now), self.leader.interval),
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Expiry engine iteration failed")
+                # reseed on the next iteration so popped deadlines are not lost
+                self._seeded_until = datetime.now(timezone.utc)
+                self._capped = False
+                await asyncio.sleep(settings.notes.expiry_retry_seconds)
+
+
+expiry_engine = ExpiryEngine(
+    db_helper=db_helper,
+    horizon=timedelta(seconds=settings.notes.expiry_horizon_seconds),
+    batch_size=settings.notes.expiry_batch_size,
+    seed_limit=settings.notes.expiry_seed_limit,
+    poll_interval=timedelta(seconds=settings.notes.expiry_poll_seconds),
+    leader=leader_election,
+)
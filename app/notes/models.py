@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime
+from sqlalchemy import BigInteger, DateTime, Index
+from sqlalchemy import text as sql_text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.models.base import Base
@@ -8,14 +9,44 @@ from app.core.models.mixin.int_id_pk import IdIntMixin
 
 
 class Note(Base, IdIntMixin):
+    """A note; the table may be partitioned by expiry (see migration c3a6a89f1cc6).
+
+    A partitioned ``notes`` has no primary key or unique index: ids come
+    from the sequence and ``note_hash`` uniqueness is enforced by the
+    ``notes_unique_note_hash`` trigger on insert and on hash updates.
+    """
+
     __tablename__ = "notes"
 
     text: Mapped[str] = mapped_column(nullable=False)
     secret: Mapped[str] = mapped_column(nullable=False)
-    note_hash: Mapped[str] = mapped_column(nullable=False)
+    note_hash: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
     is_ephemeral: Mapped[bool] = mapped_column(default=False, nullable=False)
     lifetime: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
     image: Mapped[str] = mapped_column(nullable=True)
 
+    __table_args__ = (
+        Index(
+            "ix_notes_lifetime",
+            "lifetime",
+            postgresql_where=sql_text("lifetime IS NOT NULL"),
+        ),
+    )
+
     def __str__(self):
         return f"Note: {self.id}"
+
+
+class NoteCounter(Base, IdIntMixin):
+    """Running total of ``notes``, maintained by database triggers.
+
+    The total is spread over several slot rows so concurrent writers do
+    not queue on one row lock; the count is the sum of all slots.
+    """
+
+    __tablename__ = "note_counters"
+
+    total: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+    def __str__(self):
+        return f"NoteCounter: {self.total}"
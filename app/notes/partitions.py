@@ -0,0 +1,263 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.metrics import Metric, metrics
+from app.core.models.db_helper import DataBaseHelper
+from app.utils.image_gc import image_gc
+
+log = logging.getLogger(__name__)
+
+type PartitionInterval = Literal["hour", "day"]
+
+PARTITION_INTERVALS: dict[PartitionInterval, timedelta] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+PARTITION_NAME_FORMATS: dict[PartitionInterval, str] = {
+    "hour": "%Y%m%d%H",
+    "day": "%Y%m%d",
+}
+PARTITION_PREFIX = "notes_p"
+# notes without a lifetime sort after every bucket, into notes_forever
+PARTITION_KEY = "COALESCE(lifetime, 'infinity'::timestamptz)"
+FOREVER_PARTITION = "notes_forever"
+DEFAULT_PARTITION = "notes_default"
+
+PARTITION_COMMENT_PREFIX = "partition_interval="
+
+IS_PARTITIONED_QUERY = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'notes'::regclass)"
+)
+# the partitioning migration records its interval in the table comment
+PARTITION_INTERVAL_QUERY = text(
+    "SELECT obj_description(partrelid, 'pg_class') AS comment "
+    "FROM pg_partitioned_table WHERE partrelid = 'notes'::regclass"
+)
+BUCKET_PARTITIONS_QUERY = text(
+    r"""
+    SELECT c.relname AS name, i.inhparent IS NOT NULL AS attached
+    FROM pg_class AS c
+    LEFT JOIN pg_inherits AS i ON i.inhrelid = c.oid
+    WHERE c.relkind = 'r'
+      AND c.relnamespace = current_schema()::regnamespace
+      AND c.relname LIKE 'notes\_p%'
+    """
+)
+
+
+def bucket_start(moment: datetime, interval: PartitionInterval) -> datetime:
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if interval == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def upcoming_buckets(
+    now: datetime, interval: PartitionInterval, ahead: int
+) -> list[datetime]:
+    """Start of the current bucket and of the ``ahead`` buckets after it."""
+    first = bucket_start(now, interval)
+    return [first + PARTITION_INTERVALS[interval] * i for i in range(ahead + 1)]
+
+
+def partition_name(start: datetime, interval: PartitionInterval) -> str:
+    return PARTITION_PREFIX + start.strftime(PARTITION_NAME_FORMATS[interval])
+
+
+def partition_start(name: str, interval: PartitionInterval) -> datetime | None:
+    """Bucket start encoded in a partition name, ``None`` for other tables."""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        start = datetime.strptime(
+            name.removeprefix(PARTITION_PREFIX), PARTITION_NAME_FORMATS[interval]
+        )
+    except ValueError:
+        return None
+    return start.replace(tzinfo=timezone.utc)
+
+
+def partition_bounds(start: datetime, interval: PartitionInterval) -> str:
+    end = start + PARTITION_INTERVALS[interval]
+    return f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+
+async def detect_partition_interval(db_helper: DataBaseHelper) -> PartitionInterval | None:
+    """Expiry bucket size of the ``notes`` table, ``None`` when it is not partitioned.
+
+    Read from the schema rather than the settings so the app always
+    follows what the migration actually built.
+    """
+    async with db_helper.engine.connect() as connection:
+        row = (await connection.execute(PARTITION_INTERVAL_QUERY)).first()
+    if row is None:
+        return None
+    interval = (row.comment or "").removeprefix(PARTITION_COMMENT_PREFIX)
+    if interval not in PARTITION_INTERVALS:
+        raise RuntimeError(f"notes is partitioned with an unknown interval: {row.comment!r}")
+    return interval
+
+
+@dataclass
+class PartitionStats:
+    created: int = 0
+    dropped: int = 0
+    dropped_notes: int = 0
+
+
+async def maintain_partitions(
+    db_helper: DataBaseHelper,
+    interval: PartitionInterval,
+    ahead: int = settings.notes.partitions_ahead,
+    lock_timeout: str = settings.notes.partition_lock_timeout,
+) -> PartitionStats:
+    """Create upcoming expiry partitions of ``notes`` and drop expired ones.
+
+    A new partition takes over matching rows from ``notes_default`` before
+    it is attached. An expired partition is first detached, which only
+    needs a short lock on ``notes``; its rows are then counted off the
+    note counter, its images handed to the image GC and the table dropped,
+    so expired notes are never deleted row by row. Each step runs in its
+    own transaction with ``lock_timeout``; a step that cannot get its
+    locks is retried on the next run, as is dropping partitions left
+    detached by an interrupted run.
+    """
+    stats = PartitionStats()
+    step = PARTITION_INTERVALS[interval]
+    now = datetime.now(timezone.utc)
+
+    async with db_helper.engine.connect() as connection:
+        async with connection.begin():
+            if not await connection.scalar(IS_PARTITIONED_QUERY):
+                log.warning("Skipping partition maintenance, notes is no longer partitioned")
+                return stats
+            result = await connection.execute(BUCKET_PARTITIONS_QUERY)
+            attached, detached = set(), set()
+            for row in result:
+                start = partition_start(row.name, interval)
+                if start is not None:
+                    (attached if row.attached else detached).add(start)
+
+        for start in upcoming_buckets(now, interval, ahead):
+            if start not in attached and await _create_partition(
+                connection, start, interval, lock_timeout
+            ):
+                stats.created += 1
+
+        for start in sorted(attached):
+            if start + step <= now and await _detach_partition(
+                connection, start, interval, lock_timeout
+            ):
+                detached.add(start)
+
+        for start in sorted(detached):
+            if start + step > now:
+                continue
+            dropped_notes = await _drop_partition(connection, start, interval, lock_timeout)
+            if dropped_notes is not None:
+                stats.dropped += 1
+                stats.dropped_notes += dropped_notes
+
+    log.info(
+        "Partition maintenance created %d and dropped %d partitions (%d notes)",
+        stats.created,
+        stats.dropped,
+        stats.dropped_notes,
+    )
+    return stats
+
+
+async def _set_lock_timeout(connection: AsyncConnection, lock_timeout: str) -> None:
+    await connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+
+
+async def _create_partition(
+    connection: AsyncConnection,
+    start: datetime,
+    interval: PartitionInterval,
+    lock_timeout: str,
+) -> bool:
+    name = partition_name(start, interval)
+    end = start + PARTITION_INTERVALS[interval]
+    try:
+        async with connection.begin():
+            await _set_lock_timeout(connection, lock_timeout)
+            # notes beyond the horizon wait in the default partition until their bucket exists
+            await connection.execute(
+                text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE")
+            )
+            await connection.execute(text(f"CREATE TABLE {name} (LIKE notes INCLUDING DEFAULTS)"))
+            await connection.execute(
+                text(
+                    f"WITH moved AS ("
+                    f"DELETE FROM {DEFAULT_PARTITION} "
+                    f"WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end RETURNING *"
+                    f") INSERT INTO {name} SELECT * FROM moved"
+                ),
+                {"start": start, "end": end},
+            )
+            await connection.execute(
+                text(
+                    f"ALTER TABLE notes ATTACH PARTITION {name} "
+                    f"{partition_bounds(start, interval)}"
+                )
+            )
+    except DBAPIError:
+        log.exception("Could not create partition %s", name)
+        return False
+    return True
+
+
+async def _detach_partition(
+    connection: AsyncConnection,
+    start: datetime,
+    interval: PartitionInterval,
+    lock_timeout: str,
+) -> bool:
+    name = partition_name(start, interval)
+    try:
+        async with connection.begin():
+            await _set_lock_timeout(connection, lock_timeout)
+            await connection.execute(text(f"ALTER TABLE notes DETACH PARTITION {name}"))
+    except DBAPIError:
+        log.exception("Could not detach partition %s", name)
+        return False
+    return True
+
+
+async def _drop_partition(
+    connection: AsyncConnection,
+    start: datetime,
+    interval: PartitionInterval,
+    lock_timeout: str,
+) -> int | None:
+    name = partition_name(start, interval)
+    try:
+        async with connection.begin():
+            await _set_lock_timeout(connection, lock_timeout)
+            images = list(
+                await connection.scalars(
+                    text(f"SELECT image FROM {name} WHERE image IS NOT NULL")
+                )
+            )
+            count = await connection.scalar(text(f"SELECT count(*) FROM {name}"))
+            # dropping a table bypasses the statement triggers that maintain the counter
+            # any slot will do, readers sum them
+            await connection.execute(
+                text("UPDATE note_counters SET total = total - :count WHERE id = 1"),
+                {"count": count},
+            )
+            await connection.execute(text(f"DROP TABLE {name}"))
+    except DBAPIError:
+        log.exception("Could not drop partition %s", name)
+        return None
+    metrics.inc(Metric.NOTES_EXPIRED, count)
+    image_gc.discard(images)
+    return count
@@ -1,20 +1,38 @@
-from datetime import datetime, timedelta, timezone
-from secrets import compare_digest
-
-from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile, status
+from fastapi import APIRouter, Body, Depends, File, Form, Query, Request, UploadFile, status
 from fastapi.responses import HTMLResponse, ORJSONResponse
-from fastapi_babel import _
-from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.core.config import settings
+from app.core.metrics import Metric, metrics
 from app.core.models.db_helper import db_helper
+from app.core.page_cache import page_cache
 from app.core.templates import templates
 from app.errors_handlers import bad_request, not_found, success_response
+from app.localization import _
+from app.notes.counter import notes_counter
+from app.notes.expiry import expiry_engine
 from app.notes.models import Note
-from app.notes.services import get_note_id, is_ephemeral_note, is_lifetime_note
-from app.utils.downloading_pictures import download_image
+from app.notes.schemas import NoteCreate, NoteReveal
+from app.notes.services import (
+    DEFAULT_NOTE_LIST_FIELDS,
+    NOTE_LIST_FIELDS,
+    decode_cursor,
+    create_notes,
+    encode_cursor,
+    get_lifetime,
+    get_note_id,
+    note_list_columns,
+    reveal_note,
+    reveal_notes,
+)
+from app.utils.downloading_pictures import (
+    ImageTooLargeError,
+    UnsupportedImageError,
+    download_image,
+)
+from app.utils.image_gc import image_gc
 from app.schemas.common import MessageErrorSchema
 
 router = APIRouter(
@@ -33,15 +51,19 @@ router = APIRouter(
         400: {"model": MessageErrorSchema, "description": "Bad request"},
     },
 )
+@page_cache.cached(
+    ttl=settings.page_cache.home_ttl,
+    cache_control=settings.page_cache.home_cache_control,
+)
 async def get_home_page(
-    request: Request, db: AsyncSession = Depends(db_helper.session_getter)
+    request: Request, db: AsyncSession = Depends(db_helper.read_session_getter)
 ):
-    notes_count = await db.scalar(select(func.count()).select_from(Note))
+    notes_count = await notes_counter.get(db)
     return templates.TemplateResponse(
         request,
         "index.html",
         {
-            "notes_count": notes_count or 0,
+            "notes_count": notes_count,
             "locale": request.cookies.get("locale", "en"),
         },
     )
@@ -73,21 +95,19 @@ async def create_note(
         return bad_request(_("Ephemeral notes cannot have a lifetime"))
 
     lifetime = None
-    seconds_in_hour: int = 3600
-    seconds_in_minute: int = 60
-
     if not is_ephemeral:
-        total_seconds = (
-            lifetime_hours * seconds_in_hour
-            + lifetime_minutes * seconds_in_minute
-            + lifetime_seconds
+        lifetime = get_lifetime(
+            hours=lifetime_hours, minutes=lifetime_minutes, seconds=lifetime_seconds
         )
-        if total_seconds > 0:
-            lifetime = datetime.now(timezone.utc) + timedelta(seconds=total_seconds)
 
     note_id = get_note_id(text=text, salt=secret)
 
-    saved_filename = await download_image(image) if image else None
+    try:
+        saved_filename = await download_image(image) if image else None
+    except ImageTooLargeError:
+        return bad_request(_("Image is too large"))
+    except UnsupportedImageError:
+        return bad_request(_("Unsupported image type"))
 
     note = Note(
         text=text,
@@ -98,11 +118,53 @@ async def create_note(
         image=saved_filename,
     )
     db.add(note)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        await image_gc.remove([saved_filename])
+        return bad_request(_("Such a note already exists"))
+
+    metrics.inc(Metric.NOTES_CREATED)
+    if lifetime is not None:
+        expiry_engine.schedule(note.id, lifetime)
 
     return success_response({"note_id": note_id})
 
 
+@router.post(
+    "/batch",
+    summary="Create notes in bulk",
+    response_description="Ids of the created notes, in request order",
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": MessageErrorSchema, "description": "Bad request"},
+    },
+)
+async def create_notes_batch(
+    db: AsyncSession = Depends(db_helper.session_getter),
+    notes: list[NoteCreate] = Body(
+        ..., min_length=1, max_length=settings.notes.batch_max_size
+    ),
+) -> ORJSONResponse:
+    note_ids = [get_note_id(text=note.text, salt=note.secret) for note in notes]
+    if len(set(note_ids)) != len(note_ids):
+        return bad_request(_("Such a note already exists"))
+
+    try:
+        created = await create_notes(db, notes, note_ids)
+    except IntegrityError:
+        await db.rollback()
+        return bad_request(_("Such a note already exists"))
+
+    metrics.inc(Metric.NOTES_CREATED, len(created))
+    for note in created:
+        if note.lifetime is not None:
+            expiry_engine.schedule(note.id, note.lifetime)
+
+    return success_response({"note_ids": note_ids})
+
+
 @router.get(
     "/result/{note_id}",
     response_class=HTMLResponse,
@@ -114,6 +176,10 @@ async def create_note(
         404: {"model": MessageErrorSchema, "description": "Not found"},
     },
 )
+@page_cache.cached(
+    ttl=settings.page_cache.result_ttl,
+    cache_control=settings.page_cache.result_cache_control,
+)
 async def get_result_id(request: Request, note_id: str):
     return templates.TemplateResponse(
         request,
@@ -137,25 +203,57 @@ async def get_note(
     note_id: str = Form(...),
     note_secret: str = Form(...),
 ) -> ORJSONResponse:
-    result = await db.execute(select(Note).where(Note.note_hash == note_id))
-    note = result.scalars().first()
+    note = await reveal_note(db, note_hash=note_id, secret=note_secret)
+    if note is None:
+        return not_found(_("Such a note does not exist"))
 
-    if note and compare_digest(str(note.secret), str(note_secret)):
-        if await is_lifetime_note(note, db):
-            return not_found(_("Such a note does not exist"))
+    metrics.inc(Metric.NOTES_REVEALED)
+    if note.is_ephemeral:
+        # the note page still has to load the image once
+        image_gc.discard([note.image], delay=settings.images.consumed_delay_seconds)
 
-        note_text = note.text
-        note_image = note.image or ""
+    return success_response(
+        {
+            "note_final_text": note.text,
+            "note_image": note.image or "",
+        }
+    )
 
-        await is_ephemeral_note(note, db)
 
-        return success_response(
-            {
-                "note_final_text": note_text,
-                "note_image": note_image,
-            }
-        )
-    return not_found(_("Such a note does not exist"))
+@router.post(
+    "/batch/get_notes",
+    summary="Get notes in bulk",
+    response_description="Per-note results, in request order",
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": MessageErrorSchema, "description": "Bad request"},
+    },
+)
+async def get_notes_batch(
+    db: AsyncSession = Depends(db_helper.session_getter),
+    items: list[NoteReveal] = Body(
+        ..., min_length=1, max_length=settings.notes.batch_max_size
+    ),
+) -> ORJSONResponse:
+    notes = await reveal_notes(db, items)
+    metrics.inc(Metric.NOTES_REVEALED, sum(note is not None for note in notes))
+    image_gc.discard(
+        [note.image for note in notes if note and note.is_ephemeral],
+        delay=settings.images.consumed_delay_seconds,
+    )
+    return success_response(
+        {
+            "notes": [
+                {
+                    "note_id": item.note_id,
+                    "found": note is not None,
+                    "note_final_text": note.text if note else None,
+                    "note_image": (note.image or "") if note else None,
+                }
+                for item, note in zip(items, notes)
+            ]
+        }
+    )
 
 
 @router.get(
@@ -193,27 +291,42 @@ async def get_result_note(request: Request, note_text: str, note_image: str = ""
     },
 )
 async def get_notes(
-    db: AsyncSession = Depends(db_helper.session_getter),
+    db: AsyncSession = Depends(db_helper.read_session_getter),
     page: int = Query(1, ge=1),
     per_page: int = Query(3, ge=1, le=100),
+    cursor: str | None = Query(None, description="Opaque cursor from next_cursor"),
+    fields: str = Query(
+        DEFAULT_NOTE_LIST_FIELDS,
+        description=f"Comma separated columns to return, any of: {', '.join(NOTE_LIST_FIELDS)}",
+    ),
 ) -> ORJSONResponse:
-    offset = (page - 1) * per_page
-    total = await db.scalar(select(func.count()).select_from(Note)) or 0
-    result = await db.execute(select(Note).offset(offset).limit(per_page))
-    notes = result.scalars().all()
-    notes_data = [
-        {
-            "id": note.id,
-            "text": note.text,
-            "image": note.image,
-        }
-        for note in notes
-    ]
+    try:
+        columns = note_list_columns(fields)
+    except ValueError:
+        return bad_request(_("Unknown note field"))
+
+    notes_table = Note.__table__
+    query = select(*columns).order_by(notes_table.c.id).limit(per_page + 1)
+    if cursor is not None:
+        try:
+            last_id = decode_cursor(cursor)
+        except ValueError:
+            return bad_request(_("Invalid cursor"))
+        query = query.where(notes_table.c.id > last_id)
+    else:
+        query = query.offset((page - 1) * per_page)
+
+    total = await notes_counter.get(db)
+    result = await db.execute(query)
+    notes_data = [dict(row) for row in result.mappings().all()]
+    has_more = len(notes_data) > per_page
+    notes_data = notes_data[:per_page]
     return success_response(
         {
             "notes": notes_data,
-            "page": page,
+            "page": page if cursor is None else None,
             "per_page": per_page,
             "total_notes": total,
+            "next_cursor": encode_cursor(notes_data[-1]["id"]) if has_more else None,
         }
     )
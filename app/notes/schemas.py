@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field, model_validator
+
+
+class NoteCreate(BaseModel):
+    secret: str
+    text: str
+    lifetime_hours: int = Field(0, ge=0)
+    lifetime_minutes: int = Field(0, ge=0)
+    lifetime_seconds: int = Field(0, ge=0)
+    is_ephemeral: bool = False
+
+    @model_validator(mode="after")
+    def check_ephemeral_lifetime(self) -> "NoteCreate":
+        if self.is_ephemeral and (
+            self.lifetime_hours > 0 or self.lifetime_minutes > 0 or self.lifetime_seconds > 0
+        ):
+            raise ValueError("Ephemeral notes cannot have a lifetime")
+        return self
+
+
+class NoteReveal(BaseModel):
+    note_id: str
+    secret: str
@@ -1,46 +1,278 @@
+import base64
+import binascii
 import hashlib
-from datetime import datetime, timezone
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from secrets import compare_digest
 
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Integer,
+    Row,
+    String,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    or_,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.core.config import settings
+from app.core.metrics import Metric, metrics
 from app.core.models.db_helper import DataBaseHelper
 from app.notes.models import Note
+from app.notes.schemas import NoteCreate, NoteReveal
+from app.utils.image_gc import image_gc
+
+log = logging.getLogger(__name__)
+
+NOTE_LIST_FIELDS = ("id", "text", "image", "is_ephemeral", "lifetime")
+DEFAULT_NOTE_LIST_FIELDS = "id,image"
 
 
 def get_note_id(text: str, salt: str) -> str:
     return hashlib.sha256(text.encode("UTF-8") + salt.encode("UTF-8")).hexdigest()
 
 
-async def is_lifetime_note(note: Note, db: AsyncSession):
-    if note.lifetime and datetime.now(timezone.utc) > note.lifetime:
-        await db.delete(note)
-        await db.commit()
-        return True
-    return False
+def get_lifetime(hours: int = 0, minutes: int = 0, seconds: int = 0) -> datetime | None:
+    total_seconds = hours * 3600 + minutes * 60 + seconds
+    if total_seconds > 0:
+        return datetime.now(timezone.utc) + timedelta(seconds=total_seconds)
+    return None
+
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque keyset pagination cursor pointing after the note with ``last_id``."""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Malformed cursor") from e
+    prefix, _, last_id = raw.partition(":")
+    if prefix != "id" or not last_id.isdigit():
+        raise ValueError("Malformed cursor")
+    return int(last_id)
+
+
+def note_list_columns(fields: str) -> list[Column]:
+    """Table columns for a comma separated ``fields`` projection; ``id`` is always included."""
+    names = ["id"]
+    for name in (field.strip() for field in fields.split(",")):
+        if not name or name in names:
+            continue
+        if name not in NOTE_LIST_FIELDS:
+            raise ValueError(f"Unknown field: {name}")
+        names.append(name)
+    return [Note.__table__.c[name] for name in names]
+
+
+def note_is_active() -> ColumnElement[bool]:
+    """SQL condition matching notes that have no lifetime or have not expired yet."""
+    return or_(Note.lifetime.is_(None), Note.lifetime > func.now())
+
+
+async def reveal_note(
+    db: AsyncSession, note_hash: str, secret: str
+) -> Row[tuple[str, str | None, bool]] | None:
+    """Fetch a note's text and image in a single statement.
+
+    Ephemeral notes are consumed by a ``DELETE ... RETURNING`` in the same
+    statement, so concurrent readers race on the row lock and only one of
+    them gets the text back.
+    """
+    matches = (Note.note_hash == note_hash, Note.secret == secret, note_is_active())
+    consumed = (
+        delete(Note)
+        .where(*matches, Note.is_ephemeral.is_(True))
+        .returning(Note.text, Note.image, Note.is_ephemeral)
+        .cte("consumed")
+    )
+    kept = select(Note.text, Note.image, Note.is_ephemeral).where(
+        *matches, Note.is_ephemeral.is_(False)
+    )
+    result = await db.execute(
+        union_all(
+            select(consumed.c.text, consumed.c.image, consumed.c.is_ephemeral), kept
+        )
+    )
+    note = result.first()
+    await db.commit()
+    return note
+
 
+async def reveal_notes(
+    db: AsyncSession, items: list[NoteReveal]
+) -> list[Row | None]:
+    """Reveal many notes with one lookup; results are aligned with ``items``.
 
-async def is_ephemeral_note(note: Note, db: AsyncSession):
-    if note.is_ephemeral:
-        await db.delete(note)
-        await db.commit()
-        return True
-    return False
+    Secrets are compared in constant time. Matched ephemeral notes are
+    consumed by a single ``DELETE ... RETURNING`` in the same transaction;
+    only rows this call actually deleted are revealed, and each of them
+    at most once.
+    """
+    result = await db.execute(
+        select(
+            Note.id, Note.note_hash, Note.secret, Note.text, Note.image, Note.is_ephemeral
+        ).where(
+            Note.note_hash
+            == any_(
+                bindparam(
+                    "note_hashes",
+                    list({item.note_id for item in items}),
+                    type_=ARRAY(String),
+                )
+            ),
+            note_is_active(),
+        )
+    )
+    notes = {note.note_hash: note for note in result}
 
+    granted: list[Row | None] = []
+    for item in items:
+        note = notes.get(item.note_id)
+        if note is not None and compare_digest(
+            note.secret.encode("UTF-8"), item.secret.encode("UTF-8")
+        ):
+            granted.append(note)
+        else:
+            granted.append(None)
 
-async def delete_expired_notes(db_helper: DataBaseHelper):
+    ephemeral_ids = list({note.id for note in granted if note and note.is_ephemeral})
+    consumed: set[int] = set()
+    if ephemeral_ids:
+        deleted = await db.scalars(
+            delete(Note)
+            .where(
+                Note.id
+                == any_(bindparam("note_ids", ephemeral_ids, type_=ARRAY(Integer)))
+            )
+            .returning(Note.id)
+        )
+        consumed = set(deleted.all())
+    await db.commit()
+
+    revealed: list[Row | None] = []
+    for note in granted:
+        if note is not None and note.is_ephemeral:
+            if note.id not in consumed:
+                note = None
+            else:
+                consumed.discard(note.id)
+        revealed.append(note)
+    return revealed
+
+
+async def create_notes(
+    db: AsyncSession, notes: list[NoteCreate], note_ids: list[str]
+) -> Sequence[Row[tuple[int, datetime | None]]]:
+    """Insert many notes with one multi-row INSERT in a single transaction."""
+    result = await db.execute(
+        insert(Note).values(
+            [
+                {
+                    "text": note.text,
+                    "secret": note.secret,
+                    "note_hash": note_id,
+                    "is_ephemeral": note.is_ephemeral,
+                    "lifetime": get_lifetime(
+                        hours=note.lifetime_hours,
+                        minutes=note.lifetime_minutes,
+                        seconds=note.lifetime_seconds,
+                    ),
+                }
+                for note, note_id in zip(notes, note_ids)
+            ]
+        )
+        .returning(Note.id, Note.lifetime)
+    )
+    created = result.all()
+    await db.commit()
+    return created
+
+
+@dataclass
+class SweepStats:
+    deleted: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    remaining: int = 0
+    reclaimed_bytes: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.deleted / self.elapsed if self.elapsed else 0.0
+
+
+async def delete_expired_notes(
+    db_helper: DataBaseHelper,
+    batch_size: int = settings.notes.sweep_batch_size,
+    grace: timedelta = timedelta(0),
+) -> SweepStats:
+    """Delete expired notes in bounded batches, committing after each one.
+
+    Rows locked by concurrent transactions are skipped and left for the
+    next run, so the sweeper never queues behind readers or other workers.
+    Notes expired for less than ``grace`` are left alone; with a
+    partitioned table they are removed with their whole partition.
+    """
+    stats = SweepStats()
+    started = time.perf_counter()
+    expired = Note.lifetime <= (func.now() - grace if grace else func.now())
     async for session in db_helper.session_getter():
         try:
-            current_time = datetime.now(timezone.utc)
-            result = await session.execute(
-                select(Note).where(Note.lifetime <= current_time)
-            )
-            expired_notes = result.scalars().all()
+            while True:
+                batch_ids = (
+                    select(Note.id)
+                    .where(expired)
+                    .order_by(Note.lifetime)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                    .scalar_subquery()
+                )
+                result = await session.execute(
+                    delete(Note)
+                    .where(Note.id.in_(batch_ids))
+                    .returning(Note.id, Note.image)
+                )
+                rows = result.all()
+                await session.commit()
 
-            for note in expired_notes:
-                await session.delete(note)
+                stats.batches += 1
+                stats.deleted += len(rows)
+                metrics.inc(Metric.NOTES_EXPIRED, len(rows))
+                stats.reclaimed_bytes += await image_gc.remove(row.image for row in rows)
+                if len(rows) < batch_size:
+                    break
 
-            await session.commit()
+            stats.remaining = (
+                await session.scalar(select(func.count()).select_from(Note).where(expired))
+                or 0
+            )
         except Exception as e:
             await session.rollback()
             raise e
+
+    stats.elapsed = time.perf_counter() - started
+    metrics.set(Metric.SWEEP_BACKLOG, stats.remaining)
+    metrics.set(Metric.SWEEP_ROWS_PER_SECOND, round(stats.rows_per_second))
+    log.info(
+        "Deleted %d expired notes in %d batches (%.1f rows/s), %d remaining, %d image bytes reclaimed",
+        stats.deleted,
+        stats.batches,
+        stats.rows_per_second,
+        stats.remaining,
+        stats.reclaimed_bytes,
+    )
+    return stats
@@ -0,0 +1,250 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.notes.expiry import ExpiryEngine
+
+
+def _helper_with_session(session):
+    """Return an object whose session_factory opens the given session."""
+
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=session)
+    context.__aexit__ = AsyncMock(return_value=False)
+    helper = MagicMock()
+    helper.session_factory = MagicMock(return_value=context)
+    return helper
+
+
+def _engine(session=None, batch_size=10, seed_limit=1000, is_leader=True):
+    session = session or AsyncMock(spec=AsyncSession)
+    return ExpiryEngine(
+        db_helper=_helper_with_session(session),
+        horizon=timedelta(hours=1),
+        batch_size=batch_size,
+        seed_limit=seed_limit,
+        poll_interval=timedelta(seconds=5),
+        leader=SimpleNamespace(is_leader=is_leader, interval=0.01),
+    )
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_schedule_is_ignored_until_started():
+    """Notes created while the engine is stopped are left to the seed query."""
+
+    engine = _engine()
+
+    engine.schedule(1, _now())
+
+    assert engine.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_seed_loads_deadlines_within_horizon():
+    """seed fills the heap from the database and keeps already pushed entries."""
+
+    soon = _now() + timedelta(minutes=5)
+    later = _now() + timedelta(minutes=10)
+    session = AsyncMock(spec=AsyncSession)
+    session.execute = AsyncMock(
+        return_value=[SimpleNamespace(id=2, lifetime=later)]
+    )
+    engine = _engine(session)
+    engine._heap = [(soon, 1)]
+
+    await engine.seed()
+
+    assert engine.pending == 2
+    assert engine.pop_due(later) == [1, 2]
+    compiled = str(
+        session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert "notes.lifetime IS NOT NULL AND notes.lifetime <= " in compiled
+    assert "ORDER BY notes.lifetime" in compiled
+    assert "LIMIT" in compiled
+
+
+@pytest.mark.asyncio
+async def test_capped_seed_loads_backlog_in_chunks():
+    """A backlog larger than seed_limit is loaded chunk by chunk."""
+
+    overdue = _now() - timedelta(hours=2)
+    session = AsyncMock(spec=AsyncSession)
+    session.execute = AsyncMock(
+        return_value=[
+            SimpleNamespace(id=1, lifetime=overdue),
+            SimpleNamespace(id=2, lifetime=overdue + timedelta(seconds=1)),
+        ]
+    )
+    engine = _engine(session, seed_limit=2)
+    engine._task = MagicMock()
+
+    await engine.seed()
+
+    assert engine.pending == 2
+    # the window ends at the last loaded deadline
+    engine.schedule(3, _now())
+    assert engine.pending == 2
+    assert engine._reseed_at() > _now()
+    assert engine.pop_due(_now()) == [1, 2]
+    assert engine.next_wakeup(_now()) == 0
+
+
+@pytest.mark.asyncio
+async def test_pop_due_returns_expired_in_bounded_batches():
+    """Only due ids are popped, earliest first, at most batch_size at a time."""
+
+    now = _now()
+    engine = _engine(batch_size=2)
+    engine._task = MagicMock()
+    engine._seeded_until = now + timedelta(hours=1)
+    for note_id, offset in ((3, -1), (1, -3), (2, -2), (4, 60)):
+        engine.schedule(note_id, now + timedelta(seconds=offset))
+
+    assert engine.pop_due(now) == [1, 2]
+    assert engine.pop_due(now) == [3]
+    assert engine.pop_due(now) == []
+    assert engine.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_schedule_beyond_horizon_waits_for_reseed():
+    """Deadlines past the seeded window are not kept in memory."""
+
+    engine = _engine()
+    engine._task = MagicMock()
+    engine._seeded_until = _now() + timedelta(hours=1)
+
+    engine.schedule(1, _now() + timedelta(hours=2))
+
+    assert engine.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_expire_deletes_only_still_expired_notes():
+    """expire removes the due ids in one statement and returns freed images."""
+
+    result = MagicMock()
+    result.all.return_value = [
+        SimpleNamespace(id=1, image="a.png"),
+        SimpleNamespace(id=2, image=None),
+    ]
+    session = AsyncMock(spec=AsyncSession)
+    session.execute = AsyncMock(return_value=result)
+    engine = _engine(session)
+
+    assert await engine.expire([1, 2, 3]) == ["a.png"]
+
+    session.commit.assert_awaited_once()
+    compiled = session.execute.call_args.args[0].compile(
+        dialect=postgresql.dialect()
+    )
+    assert "DELETE FROM notes WHERE notes.id = ANY (" in str(compiled)
+    assert "notes.lifetime <= now()" in str(compiled)
+    assert compiled.params["note_ids"] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_engine_wakes_for_new_earlier_deadline():
+    """A newly scheduled deadline wakes the engine before its current timeout."""
+
+    session = AsyncMock(spec=AsyncSession)
+    session.execute = AsyncMock(return_value=[])
+    engine = _engine(session)
+    expired = asyncio.Event()
+
+    async def _expire(note_ids):
+        assert note_ids == [7]
+        expired.set()
+        return []
+
+    engine.expire = _expire
+    await engine.start()
+    try:
+        engine.schedule(7, _now() + timedelta(milliseconds=50))
+        await asyncio.wait_for(expired.wait(), timeout=2)
+    finally:
+        await engine.stop()
+
+    assert engine.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_follower_never_deletes():
+    """Only the leader's engine deletes; followers keep no deadlines."""
+
+    session = AsyncMock(spec=AsyncSession)
+    session.execute = AsyncMock(return_value=[])
+    engine = _engine(session, is_leader=False)
+
+    await engine.start()
+    try:
+        engine.schedule(7, _now() - timedelta(seconds=1))
+        await asyncio.sleep(0.05)
+    finally:
+        await engine.stop()
+
+    assert engine.pending == 0
+    session.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_engine_stops_deleting_after_losing_leadership():
+    """A deposed leader drops its deadlines instead of deleting them."""
+
+    session = AsyncMock(spec=AsyncSession)
+    session.execute = AsyncMock(return_value=[])
+    engine = _engine(session)
+    engine.expire = AsyncMock(return_value=[])
+
+    await engine.start()
+    try:
+        engine.schedule(7, _now() + timedelta(milliseconds=100))
+        engine.leader.is_leader = False
+        await asyncio.sleep(0.2)
+    finally:
+        await engine.stop()
+
+    assert engine.pending == 0
+    engine.expire.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_poll_picks_up_deadlines_created_by_other_workers():
+    """A note with a short lifetime created on a follower is deleted after the next poll."""
+
+    session = AsyncMock(spec=AsyncSession)
+    session.execute = AsyncMock(return_value=[])
+    engine = _engine(session)
+    engine.poll_interval = timedelta(milliseconds=20)
+    expired = asyncio.Event()
+
+    async def _expire(note_ids):
+        assert note_ids == [7]
+        expired.set()
+        return []
+
+    engine.expire = _expire
+    await engine.start()
+    try:
+        # the follower's schedule() is a no-op, only the database has the row
+        session.execute.return_value = [
+            SimpleNamespace(id=7, lifetime=_now() + timedelta(milliseconds=30))
+        ]
+        await asyncio.wait_for(expired.wait(), timeout=2)
+    finally:
+        await engine.stop()
+
+    compiled = str(
+        session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert "notes.lifetime IS NOT NULL AND notes.lifetime <= " in compiled
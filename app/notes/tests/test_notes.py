@@ -1,22 +1,31 @@
+import asyncio
 import io
-from datetime import datetime, timedelta, timezone
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import status
 from pytest_asyncio import fixture
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.models.db_helper import db_helper
+from app.core.page_cache import page_cache
 from app.main import main_app
-from app.notes.models import Note
-from app.notes.services import get_note_id
+from app.notes.counter import notes_counter
+from app.notes.services import decode_cursor, encode_cursor, get_note_id
+from app.utils.downloading_pictures import IMAGES_DIR
 
 
 BASE_URL: str = "/api/v1/notes"
 NOTE_URL: str = f"{BASE_URL}/get_note"
 CREATE_NOTE_URL: str = f"{BASE_URL}/create_note"
+BATCH_CREATE_URL: str = f"{BASE_URL}/batch"
+BATCH_NOTE_URL: str = f"{BASE_URL}/batch/get_notes"
 NOTES_LIST_URL: str = f"{BASE_URL}/notes/"
 HOME_URL: str = f"{BASE_URL}/"
 RESULT_URL: str = f"{BASE_URL}/result/"
@@ -47,6 +56,9 @@ async def mock_db_dependency(mock_db):
     """Override the database dependency for testing."""
 
     main_app.dependency_overrides[db_helper.session_getter] = lambda: mock_db
+    main_app.dependency_overrides[db_helper.read_session_getter] = lambda: mock_db
+    notes_counter.invalidate()
+    page_cache.clear()
     yield
     main_app.dependency_overrides.clear()
 
@@ -81,7 +93,7 @@ async def test_create_note_with_image(client, mock_db, mock_db_dependency):
     """Test creating a note with an image upload."""
 
     mock_db.commit = AsyncMock()
-    image_data = io.BytesIO(b"fake-image-content")
+    image_data = io.BytesIO(b"\x89PNG\r\n\x1a\nfake-image-content")
     image_file = ("file", ("test_image.png", image_data, "image/png"))
 
     with patch("app.notes.router") as mock_uuid:
@@ -110,6 +122,21 @@ async def test_create_note_with_image(client, mock_db, mock_db_dependency):
     assert note_obj.image is not None
 
 
+@pytest.mark.asyncio
+async def test_create_note_rejects_non_image_upload(client, mock_db, mock_db_dependency):
+    """Uploads that are not a supported image are rejected before the note is stored."""
+
+    response = client.post(
+        CREATE_NOTE_URL,
+        data={"secret": "test_secret", "text": "Note with image"},
+        files={"image": ("test_image.png", io.BytesIO(b"<html></html>"), "image/png")},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["message"] == "Unsupported image type"
+    mock_db.add.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_create_ephemeral_note(client, mock_db, mock_db_dependency):
     """Test creating an ephemeral note."""
@@ -188,6 +215,119 @@ async def test_create_ephemeral_note_with_lifetime_error(
     mock_db.add.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_create_duplicate_note_error(client, mock_db, mock_db_dependency):
+    """Test error when a note with the same text and secret already exists."""
+
+    mock_db.commit = AsyncMock(side_effect=IntegrityError("INSERT", {}, Exception()))
+    mock_db.rollback = AsyncMock()
+
+    response = client.post(
+        CREATE_NOTE_URL,
+        data={
+            "secret": "test_secret",
+            "text": "This is a duplicate note",
+        },
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Such a note already exists" in response.json()["message"]
+
+    mock_db.rollback.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_duplicate_note_removes_uploaded_image(
+    client, mock_db, mock_db_dependency
+):
+    """The image stored for a rejected duplicate note is removed again."""
+
+    mock_db.commit = AsyncMock(side_effect=IntegrityError("INSERT", {}, Exception()))
+    mock_db.rollback = AsyncMock()
+
+    response = client.post(
+        CREATE_NOTE_URL,
+        data={"secret": "test_secret", "text": "This is a duplicate note"},
+        files={"image": ("test_image.png", io.BytesIO(b"\x89PNG\r\n\x1a\nx"), "image/png")},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    stored = mock_db.add.call_args.args[0].image
+    assert stored is not None
+    assert not (IMAGES_DIR / stored).exists()
+
+
+@pytest.mark.asyncio
+async def test_create_notes_batch(client, mock_db, mock_db_dependency):
+    """Test creating several notes with one multi-row INSERT."""
+
+    mock_db.commit = AsyncMock()
+    payload = [
+        {"secret": "s1", "text": "first note"},
+        {"secret": "s2", "text": "second note", "lifetime_minutes": 5},
+        {"secret": "s3", "text": "third note", "is_ephemeral": True},
+    ]
+
+    response = client.post(BATCH_CREATE_URL, json=payload)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["note_ids"] == [
+        get_note_id(text=note["text"], salt=note["secret"]) for note in payload
+    ]
+
+    mock_db.execute.assert_called_once()
+    mock_db.commit.assert_awaited_once()
+    mock_db.add.assert_not_called()
+    statement = mock_db.execute.call_args.args[0]
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert str(compiled).startswith("INSERT INTO notes")
+    assert compiled.params["is_ephemeral_m2"] is True
+    assert compiled.params["lifetime_m0"] is None
+    assert compiled.params["lifetime_m1"] is not None
+
+
+@pytest.mark.asyncio
+async def test_create_notes_batch_duplicate(client, mock_db, mock_db_dependency):
+    """Test that a batch repeating the same note is rejected before any INSERT."""
+
+    note = {"secret": "s1", "text": "same note"}
+
+    response = client.post(BATCH_CREATE_URL, json=[note, note])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Such a note already exists" in response.json()["message"]
+    mock_db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_notes_batch_existing_note(client, mock_db, mock_db_dependency):
+    """Test that a conflict with a stored note rolls the whole batch back."""
+
+    mock_db.execute.side_effect = IntegrityError("INSERT", {}, Exception())
+    mock_db.rollback = AsyncMock()
+
+    response = client.post(BATCH_CREATE_URL, json=[{"secret": "s", "text": "t"}])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    mock_db.rollback.assert_awaited_once()
+    mock_db.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_notes_batch_ephemeral_with_lifetime(
+    client, mock_db, mock_db_dependency
+):
+    """Test that an ephemeral note with a lifetime fails validation."""
+
+    response = client.post(
+        BATCH_CREATE_URL,
+        json=[{"secret": "s", "text": "t", "is_ephemeral": True, "lifetime_hours": 1}],
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    mock_db.execute.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_get_note(client, mock_db, mock_db_dependency):
     """Test getting a note with valid ID and secret."""
@@ -196,38 +336,23 @@ async def test_get_note(client, mock_db, mock_db_dependency):
     note_secret = "test_secret"
     note_text = "This is a test note"
 
-    mock_note = Note(
-        text=note_text,
-        secret=note_secret,
-        note_hash=note_id,
-        is_ephemeral=False,
-        lifetime=None,
-        image=None,
-    )
-
     mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = mock_note
+    mock_result.first.return_value = SimpleNamespace(
+        text=note_text, image=None, is_ephemeral=False
+    )
     mock_db.execute.return_value = mock_result
 
-    with (
-        patch(
-            "app.notes.router.is_lifetime_note", return_value=False
-        ) as mock_lifetime,
-        patch(
-            "app.notes.router.is_ephemeral_note", return_value=False
-        ) as mock_ephemeral,
-    ):
-        response = client.post(
-            NOTE_URL,
-            data={"note_id": note_id, "note_secret": note_secret},
-        )
+    response = client.post(
+        NOTE_URL,
+        data={"note_id": note_id, "note_secret": note_secret},
+    )
 
-        assert response.status_code == status.HTTP_200_OK
-        assert response.json()["note_final_text"] == note_text
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["note_final_text"] == note_text
+    assert response.json()["note_image"] == ""
 
-        mock_db.execute.assert_called_once()
-        mock_lifetime.assert_called_once_with(mock_note, mock_db)
-        mock_ephemeral.assert_called_once_with(mock_note, mock_db)
+    mock_db.execute.assert_called_once()
+    mock_db.commit.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -237,129 +362,281 @@ async def test_get_note_expired_lifetime(client, mock_db, mock_db_dependency):
     note_id = "test_note_id"
     note_secret = "test_secret"
 
-    mock_note = Note(
-        text="This is an expired note",
-        secret=note_secret,
-        note_hash=note_id,
-        is_ephemeral=False,
-        lifetime=datetime.now(timezone.utc) - timedelta(hours=1),
-        image=None,
-    )
-
+    # expired rows are filtered out by the lookup query itself
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = mock_note
+    mock_result.first.return_value = None
     mock_db.execute.return_value = mock_result
 
-    with patch("app.notes.services.is_lifetime_note", return_value=True):
-        response = client.post(
-            NOTE_URL,
-            data={"note_id": note_id, "note_secret": note_secret},
-        )
+    response = client.post(
+        NOTE_URL,
+        data={"note_id": note_id, "note_secret": note_secret},
+    )
 
-        assert response.status_code == status.HTTP_404_NOT_FOUND
-        assert "Such a note does not exist" in response.json()["message"]
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "Such a note does not exist" in response.json()["message"]
+
+    statement = mock_db.execute.call_args.args[0]
+    compiled = str(statement.compile(dialect=postgresql.dialect()))
+    assert "notes.note_hash = " in compiled
+    assert "notes.lifetime IS NULL OR notes.lifetime > now()" in compiled
 
 
 @pytest.mark.asyncio
 async def test_get_note_wrong_secret(client, mock_db, mock_db_dependency):
     """Test getting a note with an incorrect secret."""
 
-    note_id = "test_note_id"
-    note_secret = "test_secret"
-    wrong_secret = "wrong_secret"
-
-    mock_note = Note(
-        text="This is a protected note",
-        secret=note_secret,
-        note_hash=note_id,
-        is_ephemeral=False,
-        lifetime=None,
-        image=None,
-    )
-
+    # the secret is part of the WHERE clause, so a wrong one matches nothing
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = mock_note
+    mock_result.first.return_value = None
     mock_db.execute.return_value = mock_result
 
     response = client.post(
         NOTE_URL,
-        data={"note_id": note_id, "note_secret": wrong_secret},
+        data={"note_id": "test_note_id", "note_secret": "wrong_secret"},
     )
 
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert "Such a note does not exist" in response.json()["message"]
 
+    statement = mock_db.execute.call_args.args[0]
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert "notes.secret = " in str(compiled)
+    assert "wrong_secret" in compiled.params.values()
+
+
+@pytest.mark.asyncio
+async def test_get_notes_batch(client, mock_db, mock_db_dependency):
+    """Test revealing several notes with one lookup and per-item results."""
+
+    mock_db.execute.return_value = [
+        SimpleNamespace(
+            id=1, note_hash="a", secret="sa", text="A", image=None, is_ephemeral=False
+        ),
+        SimpleNamespace(
+            id=2, note_hash="b", secret="sb", text="B", image="b.png", is_ephemeral=True
+        ),
+    ]
+    mock_db.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[2])))
+
+    with patch("app.notes.router.image_gc") as mock_image_gc:
+        response = client.post(
+            BATCH_NOTE_URL,
+            json=[
+                {"note_id": "a", "secret": "sa"},
+                {"note_id": "b", "secret": "sb"},
+                {"note_id": "a", "secret": "wrong"},
+                {"note_id": "missing", "secret": "s"},
+            ],
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["notes"] == [
+        {"note_id": "a", "found": True, "note_final_text": "A", "note_image": ""},
+        {"note_id": "b", "found": True, "note_final_text": "B", "note_image": "b.png"},
+        {"note_id": "a", "found": False, "note_final_text": None, "note_image": None},
+        {
+            "note_id": "missing",
+            "found": False,
+            "note_final_text": None,
+            "note_image": None,
+        },
+    ]
+    mock_db.execute.assert_called_once()
+    mock_db.scalars.assert_awaited_once()
+    mock_db.commit.assert_awaited_once()
+    mock_image_gc.discard.assert_called_once_with(["b.png"], delay=ANY)
+
 
 @pytest.mark.asyncio
 async def test_get_notes_pagination(client, mock_db, mock_db_dependency):
     """Test getting notes with pagination."""
 
     mock_notes = [
-        Note(id=1, text="Note 1", image=None),
-        Note(id=2, text="Note 2", image="image2.png"),
-        Note(id=3, text="Note 3", image=None),
+        {"id": 1, "text": "Note 1", "image": None},
+        {"id": 2, "text": "Note 2", "image": "image2.png"},
+        {"id": 3, "text": "Note 3", "image": None},
     ]
 
     mock_result = MagicMock()
-    mock_result.scalars().all.return_value = mock_notes
+    mock_result.mappings().all.return_value = mock_notes
     mock_db.execute.return_value = mock_result
     mock_db.scalar = AsyncMock(return_value=3)
 
-    response = client.get(f"{NOTES_LIST_URL}?page=1&per_page=3")
+    response = client.get(f"{NOTES_LIST_URL}?page=1&per_page=3&fields=text,image")
 
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["page"] == 1
     assert data["per_page"] == 3
     assert data["total_notes"] == 3
+    assert data["next_cursor"] is None
     assert len(data["notes"]) == 3
 
     for i, note in enumerate(data["notes"]):
-        assert note["id"] == mock_notes[i].id
-        assert note["text"] == mock_notes[i].text
-        assert note["image"] == mock_notes[i].image
+        assert note["id"] == mock_notes[i]["id"]
+        assert note["text"] == mock_notes[i]["text"]
+        assert note["image"] == mock_notes[i]["image"]
+
+
+@pytest.mark.asyncio
+async def test_get_notes_defers_text_by_default(client, mock_db, mock_db_dependency):
+    """Without fields= only id and image are selected, never text or secret."""
+
+    mock_result = MagicMock()
+    mock_result.mappings().all.return_value = [{"id": 1, "image": None}]
+    mock_db.execute.return_value = mock_result
+    mock_db.scalar = AsyncMock(return_value=1)
+
+    response = client.get(NOTES_LIST_URL)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["notes"] == [{"id": 1, "image": None}]
+
+    statement = mock_db.execute.call_args.args[0]
+    compiled = str(statement.compile(dialect=postgresql.dialect()))
+    assert compiled.startswith("SELECT notes.id, notes.image \nFROM notes")
+    assert "notes.text" not in compiled
+    assert "notes.secret" not in compiled
+
+
+@pytest.mark.asyncio
+async def test_get_notes_unknown_field(client, mock_db, mock_db_dependency):
+    """Fields outside the public projection, such as secret, are rejected."""
+
+    response = client.get(NOTES_LIST_URL, params={"fields": "id,secret"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Unknown note field" in response.json()["message"]
+    mock_db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_notes_cursor_pagination(client, mock_db, mock_db_dependency):
+    """Cursor mode seeks past the last id instead of using OFFSET."""
+
+    mock_notes = [{"id": i, "image": None} for i in (11, 12, 13)]
+
+    mock_result = MagicMock()
+    mock_result.mappings().all.return_value = mock_notes
+    mock_db.execute.return_value = mock_result
+    mock_db.scalar = AsyncMock(return_value=100)
+
+    response = client.get(
+        NOTES_LIST_URL, params={"cursor": encode_cursor(10), "per_page": 2}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [note["id"] for note in data["notes"]] == [11, 12]
+    assert data["page"] is None
+    assert decode_cursor(data["next_cursor"]) == 12
+
+    statement = mock_db.execute.call_args.args[0]
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert "notes.id > " in str(compiled)
+    assert "ORDER BY notes.id" in str(compiled)
+    assert "OFFSET" not in str(compiled)
+    assert 10 in compiled.params.values()
+
+
+@pytest.mark.asyncio
+async def test_get_notes_last_page_has_no_cursor(client, mock_db, mock_db_dependency):
+    """The last page in either mode carries no next_cursor."""
+
+    mock_result = MagicMock()
+    mock_result.mappings().all.return_value = [{"id": 5, "image": None}]
+    mock_db.execute.return_value = mock_result
+    mock_db.scalar = AsyncMock(return_value=5)
+
+    response = client.get(NOTES_LIST_URL, params={"page": 5, "per_page": 1})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["next_cursor"] is None
+    statement = mock_db.execute.call_args.args[0]
+    assert "OFFSET" in str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_get_notes_invalid_cursor(client, mock_db, mock_db_dependency):
+    """A cursor that was not issued by the API is rejected."""
+
+    response = client.get(NOTES_LIST_URL, params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Invalid cursor" in response.json()["message"]
+    mock_db.execute.assert_not_called()
 
 
 @pytest.mark.asyncio
 async def test_get_ephemeral_note(client, mock_db, mock_db_dependency):
     """Test getting an ephemeral note that will be deleted after access."""
 
-    note_id = "test_ephemeral_id"
-    note_secret = "test_secret"
     note_text = "This is an ephemeral note"
 
-    mock_note = Note(
-        text=note_text,
-        secret=note_secret,
-        note_hash=note_id,
-        is_ephemeral=True,
-        lifetime=None,
-        image=None,
-    )
-
     mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = mock_note
+    mock_result.first.return_value = SimpleNamespace(
+        text=note_text, image="image.png", is_ephemeral=True
+    )
     mock_db.execute.return_value = mock_result
 
-    with (
-        patch(
-            "app.notes.router.is_lifetime_note", return_value=False
-        ) as mock_lifetime,
-        patch(
-            "app.notes.router.is_ephemeral_note", return_value=True
-        ) as mock_ephemeral,
-    ):
+    with patch("app.notes.router.image_gc") as mock_image_gc:
         response = client.post(
             NOTE_URL,
-            data={"note_id": note_id, "note_secret": note_secret},
+            data={"note_id": "test_ephemeral_id", "note_secret": "test_secret"},
         )
 
-        assert response.status_code == status.HTTP_200_OK
-        assert response.json()["note_final_text"] == note_text
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["note_final_text"] == note_text
+    assert response.json()["note_image"] == "image.png"
+
+    # fetch and delete happen in one DELETE ... RETURNING statement
+    mock_db.execute.assert_called_once()
+    mock_db.delete.assert_not_called()
+    statement = mock_db.execute.call_args.args[0]
+    compiled = str(statement.compile(dialect=postgresql.dialect()))
+    assert "DELETE FROM notes" in compiled
+    assert "RETURNING notes.text, notes.image, notes.is_ephemeral" in compiled
+
+    # the image outlives the note just long enough for the note page to load it
+    mock_image_gc.discard.assert_called_once_with(
+        ["image.png"], delay=settings.images.consumed_delay_seconds
+    )
+
 
-        mock_db.execute.assert_called_once()
-        mock_lifetime.assert_called_once_with(mock_note, mock_db)
-        mock_ephemeral.assert_called_once_with(mock_note, mock_db)
+@pytest.mark.asyncio
+async def test_get_ephemeral_note_concurrent_reveals(mock_db, mock_db_dependency):
+    """Parallel reveals each run one statement and map an empty result to 404.
+
+    The database is mocked, so this does not prove the race itself; see
+    test_postgres for that.
+    """
+
+    readers = 20
+    consumed = MagicMock()
+    consumed.first.return_value = SimpleNamespace(
+        text="burn me", image=None, is_ephemeral=True
+    )
+    gone = MagicMock()
+    gone.first.return_value = None
+    # stands in for the database handing the row to the first DELETE only
+    mock_db.execute.side_effect = [consumed] + [gone] * (readers - 1)
+
+    transport = httpx.ASGITransport(app=main_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        responses = await asyncio.gather(
+            *(
+                ac.post(
+                    NOTE_URL,
+                    data={"note_id": "test_ephemeral_id", "note_secret": "s"},
+                )
+                for _ in range(readers)
+            )
+        )
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(status.HTTP_200_OK) == 1
+    assert statuses.count(status.HTTP_404_NOT_FOUND) == readers - 1
+    assert mock_db.execute.call_count == readers
 
 
 @pytest.mark.asyncio
@@ -367,7 +644,7 @@ async def test_get_note_not_found(client, mock_db, mock_db_dependency):
     """Test getting a note that doesn't exist."""
 
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = None
+    mock_result.first.return_value = None
     mock_db.execute.return_value = mock_result
 
     response = client.post(
@@ -391,6 +668,22 @@ async def test_get_home_page(client, mock_db, mock_db_dependency):
     assert b"!DOCTYPE html" in response.content
 
     mock_db.scalar.assert_called_once()
+    statement = mock_db.scalar.call_args.args[0]
+    assert "note_counters" in str(statement)
+    assert "count(" not in str(statement)
+
+
+@pytest.mark.asyncio
+async def test_get_home_page_caches_note_count(client, mock_db, mock_db_dependency):
+    """Repeated home page views reuse the cached note count."""
+
+    mock_db.scalar = AsyncMock(return_value=5)
+
+    client.get(BASE_URL)
+    response = client.get(BASE_URL)
+
+    assert response.status_code == status.HTTP_200_OK
+    mock_db.scalar.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -440,50 +733,3 @@ async def test_get_note_id():
     id3 = get_note_id(text=text, salt="different_salt")
 
     assert id1 != id3
-
-
-@pytest.mark.asyncio
-async def test_is_lifetime_note():
-    """Test the is_lifetime_note function."""
-
-    from app.notes.services import is_lifetime_note
-
-    future_note = Note(lifetime=datetime.now(timezone.utc) + timedelta(hours=1))
-
-    past_note = Note(lifetime=datetime.now(timezone.utc) - timedelta(hours=1))
-
-    no_lifetime_note = Note(lifetime=None)
-
-    mock_db = AsyncMock(spec=AsyncSession)
-    mock_db.delete = AsyncMock()
-    mock_db.commit = AsyncMock()
-
-    assert await is_lifetime_note(future_note, mock_db) is False
-    assert await is_lifetime_note(past_note, mock_db) is True
-    assert await is_lifetime_note(no_lifetime_note, mock_db) is False
-
-    mock_db.delete.assert_called_once_with(past_note)
-    mock_db.commit.assert_called_once()
-
-
-@pytest.mark.asyncio
-async def test_is_ephemeral_note():
-    """Test the is_ephemeral_note function."""
-
-    from app.notes.services import is_ephemeral_note
-
-    ephemeral_note = Note(is_ephemeral=True)
-
-    regular_note = Note(
-        is_ephemeral=False
-    )
-
-    mock_db = AsyncMock(spec=AsyncSession)
-    mock_db.delete = AsyncMock()
-    mock_db.commit = AsyncMock()
-
-    assert await is_ephemeral_note(ephemeral_note, mock_db) is True
-    assert await is_ephemeral_note(regular_note, mock_db) is False
-
-    mock_db.delete.assert_called_once_with(ephemeral_note)
-    mock_db.commit.assert_called_once()
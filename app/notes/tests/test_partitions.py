@@ -0,0 +1,177 @@
+import contextlib
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.notes.partitions import (
+    bucket_start,
+    detect_partition_interval,
+    maintain_partitions,
+    partition_bounds,
+    partition_name,
+    partition_start,
+    upcoming_buckets,
+)
+
+MOMENT = datetime(2026, 10, 18, 13, 41, 5, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    ("interval", "start", "name"),
+    [
+        ("hour", datetime(2026, 10, 18, 13, tzinfo=timezone.utc), "notes_p2026101813"),
+        ("day", datetime(2026, 10, 18, tzinfo=timezone.utc), "notes_p20261018"),
+    ],
+)
+def test_bucket_names_round_trip(interval, start, name):
+    assert bucket_start(MOMENT, interval) == start
+    assert partition_name(start, interval) == name
+    assert partition_start(name, interval) == start
+
+
+def test_partition_start_ignores_other_tables():
+    assert partition_start("notes_partitioned", "day") is None
+    assert partition_start("notes_default", "day") is None
+
+
+def test_upcoming_buckets_and_bounds():
+    buckets = upcoming_buckets(MOMENT, "hour", ahead=2)
+
+    assert [b.hour for b in buckets] == [13, 14, 15]
+    assert partition_bounds(buckets[0], "hour") == (
+        "FOR VALUES FROM ('2026-10-18T13:00:00+00:00') TO ('2026-10-18T14:00:00+00:00')"
+    )
+
+
+class FakeConnection:
+    """Records SQL and answers the catalog and count queries."""
+
+    def __init__(self, partitions, partitioned=True, notes=3, images=("a.png",)):
+        self.partitions = partitions
+        self.partitioned = partitioned
+        self.notes = notes
+        self.images = images
+        self.statements = []
+
+    @contextlib.asynccontextmanager
+    async def begin(self):
+        yield
+
+    async def scalar(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_partitioned_table" in sql:
+            return self.partitioned
+        return self.notes
+
+    async def scalars(self, statement, params=None):
+        self.statements.append(str(statement))
+        return list(self.images)
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_inherits" in sql:
+            return [SimpleNamespace(name=name, attached=attached) for name, attached in self.partitions]
+        return None
+
+
+def _helper(connection):
+    helper = MagicMock()
+
+    @contextlib.asynccontextmanager
+    async def connect():
+        yield connection
+
+    helper.engine.connect = connect
+    return helper
+
+
+@pytest.mark.asyncio
+async def test_maintain_partitions_creates_ahead_and_drops_expired():
+    now = datetime.now(timezone.utc)
+    today = bucket_start(now, "day")
+    expired = today - timedelta(days=2)
+    connection = FakeConnection(
+        partitions=[
+            (partition_name(expired, "day"), True),
+            (partition_name(today, "day"), True),
+            ("notes_partitioned", False),
+        ]
+    )
+
+    with patch("app.notes.partitions.image_gc") as mock_image_gc:
+        stats = await maintain_partitions(
+            _helper(connection), interval="day", ahead=2, lock_timeout="1s"
+        )
+
+    assert (stats.created, stats.dropped, stats.dropped_notes) == (2, 1, 3)
+    sql = "\n".join(connection.statements)
+    for day in (1, 2):
+        assert f"ATTACH PARTITION {partition_name(today + timedelta(days=day), 'day')}" in sql
+    assert f"DETACH PARTITION {partition_name(expired, 'day')}" in sql
+    assert f"DROP TABLE {partition_name(expired, 'day')}" in sql
+    assert "UPDATE note_counters" in sql
+    assert "DELETE FROM notes WHERE" not in sql
+    mock_image_gc.discard.assert_called_once_with(["a.png"])
+
+
+@pytest.mark.asyncio
+async def test_maintain_partitions_drops_leftover_detached_partition():
+    """A partition detached by an interrupted run is dropped on the next one."""
+
+    expired = bucket_start(datetime.now(timezone.utc), "hour") - timedelta(hours=3)
+    connection = FakeConnection(partitions=[(partition_name(expired, "hour"), False)])
+
+    with patch("app.notes.partitions.image_gc"):
+        stats = await maintain_partitions(
+            _helper(connection), interval="hour", ahead=0, lock_timeout="1s"
+        )
+
+    assert stats.dropped == 1
+    assert not any("DETACH" in sql for sql in connection.statements)
+
+
+@pytest.mark.asyncio
+async def test_maintain_partitions_skips_plain_table():
+    connection = FakeConnection(partitions=[], partitioned=False)
+
+    stats = await maintain_partitions(_helper(connection), interval="day", ahead=2)
+
+    assert (stats.created, stats.dropped) == (0, 0)
+    assert len(connection.statements) == 1
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+
+def _helper_returning(row):
+    connection = MagicMock()
+    connection.execute = AsyncMock(return_value=FakeResult(row))
+    return _helper(connection)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("row", "expected"),
+    [
+        (None, None),
+        (SimpleNamespace(comment="partition_interval=hour"), "hour"),
+        (SimpleNamespace(comment="partition_interval=day"), "day"),
+    ],
+)
+async def test_detect_partition_interval_reads_the_schema(row, expected):
+    assert await detect_partition_interval(_helper_returning(row)) == expected
+
+
+@pytest.mark.asyncio
+async def test_detect_partition_interval_rejects_unknown_comment():
+    with pytest.raises(RuntimeError):
+        await detect_partition_interval(_helper_returning(SimpleNamespace(comment=None)))
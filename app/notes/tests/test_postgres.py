@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.notes.counter import ESTIMATED_COUNT_QUERY
+from app.notes.models import Note
+from app.notes.services import reveal_note
+
+
+@pytest_asyncio.fixture
+async def pg_engine():
+    """Engine on a throwaway schema with only ``notes``; skips without a reachable Postgres."""
+
+    schema = f"test_{uuid.uuid4().hex}"
+    engine = create_async_engine(
+        str(settings.db.url),
+        poolclass=NullPool,
+        connect_args={"timeout": 2, "server_settings": {"search_path": schema}},
+    )
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+            await connection.run_sync(Note.__table__.create)
+    except (OSError, SQLAlchemyError):
+        await engine.dispose()
+        pytest.skip("Postgres is not reachable")
+
+    yield engine
+
+    async with engine.begin() as connection:
+        await connection.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reveals_consume_ephemeral_note_once(pg_engine):
+    """Of many parallel reveals of an ephemeral note, exactly one gets the text."""
+
+    session_factory = async_sessionmaker(pg_engine, expire_on_commit=False)
+    async with session_factory() as session:
+        session.add(Note(text="burn me", secret="s", note_hash="h", is_ephemeral=True))
+        await session.commit()
+
+    async def reveal():
+        async with session_factory() as session:
+            return await reveal_note(session, note_hash="h", secret="s")
+
+    results = await asyncio.gather(*(reveal() for _ in range(20)))
+
+    revealed = [note for note in results if note is not None]
+    assert [note.text for note in revealed] == ["burn me"]
+    async with session_factory() as session:
+        assert await session.get(Note, 1) is None
+
+
+@pytest.mark.asyncio
+async def test_estimated_count_sums_partitions(pg_engine):
+    """The estimate of a partitioned notes table comes from its partitions."""
+
+    async with pg_engine.begin() as connection:
+        await connection.execute(
+            text(
+                "INSERT INTO notes (text, secret, note_hash, is_ephemeral) "
+                "SELECT 't', 's', 'h' || n, false FROM generate_series(1, 50) AS n"
+            )
+        )
+        await connection.execute(text("ANALYZE notes"))
+        assert await connection.scalar(ESTIMATED_COUNT_QUERY) == 50
+
+        await connection.execute(text("DROP TABLE notes"))
+        await connection.execute(
+            text("CREATE TABLE notes (id integer) PARTITION BY RANGE (id)")
+        )
+        await connection.execute(
+            text("CREATE TABLE notes_low PARTITION OF notes FOR VALUES FROM (0) TO (100)")
+        )
+        await connection.execute(text("CREATE TABLE notes_default PARTITION OF notes DEFAULT"))
+        await connection.execute(
+            text("INSERT INTO notes SELECT n FROM generate_series(1, 150) AS n")
+        )
+        await connection.execute(text("ANALYZE notes"))
+
+        assert await connection.scalar(ESTIMATED_COUNT_QUERY) == 150
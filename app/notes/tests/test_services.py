@@ -1,19 +1,30 @@
 import io
-from datetime import datetime, timedelta, timezone
-from unittest.mock import AsyncMock, MagicMock
+import os
+import stat
+import tracemalloc
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.metrics import Metric
+from app.notes.counter import NotesCounter
 from app.notes.models import Note
+from app.notes.schemas import NoteReveal
 from app.notes.services import (
     delete_expired_notes,
     get_note_id,
-    is_ephemeral_note,
-    is_lifetime_note,
+    note_is_active,
+    reveal_note,
+    reveal_notes,
 )
 from app.utils.downloading_pictures import download_image
+from app.utils.image_gc import ImageGarbageCollector
 
 
 def _make_session():
@@ -50,59 +61,207 @@ async def test_get_note_id_is_sha256_hex():
     assert note_id != get_note_id(text="hello!", salt="salt")
 
 
+def test_note_is_active_filters_expired_in_sql():
+    """note_is_active keeps notes without a lifetime or with a future one."""
+
+    statement = select(Note.id).where(note_is_active())
+    compiled = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "notes.lifetime IS NULL OR notes.lifetime > now()" in compiled
+
+
 @pytest.mark.asyncio
-async def test_is_lifetime_note_future_keeps_note():
-    """A note whose lifetime is in the future is not deleted."""
+async def test_reveal_note_consumes_ephemeral_in_one_statement():
+    """reveal_note issues a single DELETE ... RETURNING / SELECT and commits."""
 
-    note = Note(lifetime=datetime.now(timezone.utc) + timedelta(hours=2))
+    row = MagicMock(text="hello", image=None)
+    result = MagicMock()
+    result.first.return_value = row
     session = _make_session()
+    session.execute = AsyncMock(return_value=result)
+
+    assert await reveal_note(session, note_hash="hash", secret="secret") is row
 
-    assert await is_lifetime_note(note, session) is False
+    session.execute.assert_awaited_once()
+    session.commit.assert_awaited_once()
     session.delete.assert_not_called()
 
+    compiled = str(
+        session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert "WITH consumed AS" in compiled
+    assert "notes.is_ephemeral IS true" in compiled
+    assert "RETURNING notes.text, notes.image" in compiled
+    assert "UNION ALL SELECT notes.text, notes.image" in compiled
+
 
 @pytest.mark.asyncio
-async def test_is_lifetime_note_expired_deletes():
-    """An expired note is deleted and committed."""
+async def test_reveal_note_missing_returns_none():
+    """reveal_note returns None when nothing matches the hash and secret."""
 
-    note = Note(lifetime=datetime.now(timezone.utc) - timedelta(seconds=1))
+    result = MagicMock()
+    result.first.return_value = None
     session = _make_session()
+    session.execute = AsyncMock(return_value=result)
+
+    assert await reveal_note(session, note_hash="hash", secret="wrong") is None
+
+
+def _note_row(id, note_hash, secret, is_ephemeral):
+    return SimpleNamespace(
+        id=id,
+        note_hash=note_hash,
+        secret=secret,
+        text=f"text-{id}",
+        image=None,
+        is_ephemeral=is_ephemeral,
+    )
 
-    assert await is_lifetime_note(note, session) is True
-    session.delete.assert_awaited_once_with(note)
+
+@pytest.mark.asyncio
+async def test_reveal_notes_uses_any_lookup_and_single_delete():
+    """reveal_notes looks notes up with = ANY and consumes ephemerals in one DELETE."""
+
+    regular = _note_row(1, "a", "sa", False)
+    ephemeral = _note_row(2, "b", "sb", True)
+    session = _make_session()
+    session.execute = AsyncMock(return_value=[regular, ephemeral])
+    session.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[2])))
+
+    revealed = await reveal_notes(
+        session,
+        [NoteReveal(note_id="a", secret="sa"), NoteReveal(note_id="b", secret="sb")],
+    )
+
+    assert revealed == [regular, ephemeral]
+    lookup = session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    assert "notes.note_hash = ANY (" in str(lookup)
+    assert sorted(lookup.params["note_hashes"]) == ["a", "b"]
+    delete = session.scalars.call_args.args[0].compile(dialect=postgresql.dialect())
+    assert "DELETE FROM notes WHERE notes.id = ANY (" in str(delete)
+    assert delete.params["note_ids"] == [2]
     session.commit.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-async def test_is_ephemeral_note_deletes_when_ephemeral():
-    """Ephemeral notes are removed after access; regular notes are kept."""
+async def test_reveal_notes_ephemeral_revealed_once():
+    """An ephemeral note is revealed only if deleted here, and only once."""
 
+    won = _note_row(1, "a", "sa", True)
+    lost = _note_row(2, "b", "sb", True)
     session = _make_session()
+    session.execute = AsyncMock(return_value=[won, lost])
+    # another reader deleted note 2 first
+    session.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[1])))
 
-    assert await is_ephemeral_note(Note(is_ephemeral=True), session) is True
-    assert await is_ephemeral_note(Note(is_ephemeral=False), session) is False
-    session.delete.assert_awaited_once()
+    revealed = await reveal_notes(
+        session,
+        [
+            NoteReveal(note_id="a", secret="sa"),
+            NoteReveal(note_id="a", secret="sa"),
+            NoteReveal(note_id="b", secret="sb"),
+        ],
+    )
+
+    assert revealed == [won, None, None]
 
 
 @pytest.mark.asyncio
-async def test_delete_expired_notes_removes_all_matches():
-    """delete_expired_notes deletes every expired row and commits once."""
+async def test_reveal_notes_wrong_secret_skips_delete():
+    """A wrong secret neither reveals nor consumes the note."""
+
+    session = _make_session()
+    session.execute = AsyncMock(return_value=[_note_row(1, "a", "sa", True)])
+    session.scalars = AsyncMock()
 
-    expired = [Note(id=1, lifetime=datetime.now(timezone.utc) - timedelta(hours=1)),
-               Note(id=2, lifetime=datetime.now(timezone.utc) - timedelta(hours=3))]
+    revealed = await reveal_notes(session, [NoteReveal(note_id="a", secret="nope")])
 
+    assert revealed == [None]
+    session.scalars.assert_not_called()
+
+
+def _rows_result(rows):
     result = MagicMock()
-    result.scalars.return_value.all.return_value = expired
+    result.all.return_value = rows
+    return result
 
-    session = _make_session()
-    session.execute = AsyncMock(return_value=result)
 
-    await delete_expired_notes(_helper_yielding(session))
+@pytest.mark.asyncio
+async def test_delete_expired_notes_sweeps_in_batches():
+    """delete_expired_notes deletes bounded batches and commits each one."""
 
-    assert session.delete.await_count == 2
-    session.commit.assert_awaited_once()
+    session = _make_session()
+    session.execute = AsyncMock(
+        side_effect=[
+            _rows_result([SimpleNamespace(id=1, image="a.png"), SimpleNamespace(id=2, image=None)]),
+            _rows_result([SimpleNamespace(id=3, image="c.png")]),
+        ]
+    )
+    session.scalar = AsyncMock(return_value=4)
+
+    with (
+        patch("app.notes.services.image_gc") as mock_image_gc,
+        patch("app.notes.services.metrics") as mock_metrics,
+    ):
+        mock_image_gc.remove = AsyncMock(return_value=10)
+        stats = await delete_expired_notes(_helper_yielding(session), batch_size=2)
+
+    assert stats.deleted == 3
+    assert stats.batches == 2
+    assert stats.remaining == 4
+    mock_metrics.set.assert_any_call(Metric.SWEEP_BACKLOG, 4)
+    mock_metrics.set.assert_any_call(
+        Metric.SWEEP_ROWS_PER_SECOND, round(stats.rows_per_second)
+    )
+    assert stats.reclaimed_bytes == 20
+    removed = [list(call.args[0]) for call in mock_image_gc.remove.call_args_list]
+    assert removed == [["a.png", None], ["c.png"]]
+    assert stats.rows_per_second > 0
+    assert session.commit.await_count == 2
+    session.delete.assert_not_called()
     session.rollback.assert_not_called()
 
+    compiled = str(
+        session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert compiled.startswith("DELETE FROM notes WHERE notes.id IN (SELECT notes.id")
+    assert "notes.lifetime <= now() ORDER BY notes.lifetime" in compiled
+    assert "FOR UPDATE SKIP LOCKED" in compiled
+    assert compiled.endswith("RETURNING notes.id, notes.image")
+
+
+@pytest.mark.asyncio
+async def test_delete_expired_notes_with_grace():
+    """A grace period leaves recently expired notes to partition maintenance."""
+
+    session = _make_session()
+    session.execute = AsyncMock(return_value=_rows_result([]))
+    session.scalar = AsyncMock(return_value=0)
+
+    await delete_expired_notes(
+        _helper_yielding(session), batch_size=10, grace=timedelta(hours=1)
+    )
+
+    compiled = str(
+        session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert "notes.lifetime <= now() - %(now_1)s" in compiled
+
+
+@pytest.mark.asyncio
+async def test_delete_expired_notes_nothing_expired():
+    """An empty backlog runs a single batch and reports zero throughput."""
+
+    session = _make_session()
+    session.execute = AsyncMock(return_value=_rows_result([]))
+    session.scalar = AsyncMock(return_value=0)
+
+    stats = await delete_expired_notes(_helper_yielding(session), batch_size=10)
+
+    assert stats.deleted == 0
+    assert stats.batches == 1
+    session.execute.assert_awaited_once()
+
 
 @pytest.mark.asyncio
 async def test_delete_expired_notes_rolls_back_on_error():
@@ -118,16 +277,135 @@ async def test_delete_expired_notes_rolls_back_on_error():
     session.commit.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_notes_counter_modes_use_expected_source():
+    """Each count mode reads its own source and is cached separately."""
+
+    counter = NotesCounter(ttl=60)
+    session = _make_session()
+    session.scalar = AsyncMock(side_effect=[7, 8, -1])
+
+    assert await counter.get(session) == 7
+    assert await counter.get(session, mode="exact") == 8
+    # reltuples is -1 for a table that has never been analyzed
+    assert await counter.get(session, mode="estimated") == 0
+    assert await counter.get(session) == 7
+
+    statements = [str(call.args[0]) for call in session.scalar.call_args_list]
+    assert "sum(note_counters.total)" in statements[0]
+    assert "count(*)" in statements[1]
+    assert "pg_class" in statements[2]
+    assert "pg_inherits" in statements[2]
+
+
+@pytest.mark.asyncio
+async def test_notes_counter_refreshes_after_ttl():
+    """An expired or invalidated cache entry is fetched again."""
+
+    counter = NotesCounter(ttl=0)
+    session = _make_session()
+    session.scalar = AsyncMock(side_effect=[1, 2, 3])
+
+    assert await counter.get(session) == 1
+    assert await counter.get(session) == 2
+
+    counter.ttl = 60
+    counter.invalidate()
+    assert await counter.get(session) == 3
+    assert await counter.get(session) == 3
+
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
 @pytest.mark.asyncio
 async def test_download_image_returns_unique_name(tmp_path):
-    """download_image writes bytes and returns a uuid-based filename."""
+    """download_image streams the upload and names it after the detected type."""
 
-    upload = UploadFile(filename="photo.png", file=io.BytesIO(b"binary-bytes"))
+    content = PNG_HEADER + b"binary-bytes" * 10
+    upload = UploadFile(filename="photo.jpeg", file=io.BytesIO(content))
 
-    name = await download_image(upload, upload_dir=str(tmp_path))
+    name = await download_image(upload, upload_dir=str(tmp_path), chunk_size=16)
 
     assert name.endswith(".png")
-    assert (tmp_path / name).read_bytes() == b"binary-bytes"
+    assert (tmp_path / name).read_bytes() == content
+    assert [path.name for path in tmp_path.iterdir()] == [name]
+    assert stat.S_IMODE((tmp_path / name).stat().st_mode) == 0o644
+
+
+class _GeneratedUpload:
+    """Upload of ``size`` bytes produced on demand, so the test holds no copy of it."""
+
+    size = None
+
+    def __init__(self, size):
+        self.remaining = size
+        self.header = PNG_HEADER
+
+    async def read(self, n):
+        chunk = self.header + b"x" * min(n - len(self.header), self.remaining)
+        self.header = b""
+        self.remaining -= len(chunk)
+        return chunk
+
+
+async def _peak_upload_memory(tmp_path, size):
+    tracemalloc.start()
+    try:
+        await download_image(
+            _GeneratedUpload(size), upload_dir=str(tmp_path), max_size=size, chunk_size=64 * 1024
+        )
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.asyncio
+async def test_download_image_peak_memory_is_flat(tmp_path):
+    """Peak memory of an upload does not grow with its size."""
+
+    small = await _peak_upload_memory(tmp_path, 1024 * 1024)
+    large = await _peak_upload_memory(tmp_path, 32 * 1024 * 1024)
+
+    assert large < 1024 * 1024
+    assert large < small * 2
+
+
+@pytest.mark.asyncio
+async def test_download_image_rejects_unknown_type(tmp_path):
+    """Uploads without a known image signature are refused after the first chunk."""
+
+    upload = UploadFile(filename="photo.png", file=io.BytesIO(b"#!/bin/sh\n" * 100))
+
+    with pytest.raises(ValueError, match="Unsupported image type"):
+        await download_image(upload, upload_dir=str(tmp_path), chunk_size=16)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_download_image_rejects_oversized_stream(tmp_path):
+    """The size cap is enforced while streaming and the partial file is removed."""
+
+    upload = UploadFile(filename="photo.png", file=io.BytesIO(PNG_HEADER + b"x" * 100))
+
+    with pytest.raises(ValueError, match="Image is too large"):
+        await download_image(upload, upload_dir=str(tmp_path), max_size=64, chunk_size=16)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_download_image_rejects_declared_size(tmp_path):
+    """A declared size above the cap is rejected without reading the body."""
+
+    file = MagicMock()
+    upload = UploadFile(filename="photo.png", file=file, size=1000)
+
+    with pytest.raises(ValueError, match="Image is too large"):
+        await download_image(upload, upload_dir=str(tmp_path), max_size=64)
+
+    file.read.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -136,3 +414,46 @@ async def test_download_image_none_raises():
 
     with pytest.raises(ValueError, match="No image file provided"):
         await download_image(None, upload_dir="/tmp")
+
+
+@pytest.mark.asyncio
+async def test_image_gc_remove_counts_reclaimed_bytes(tmp_path):
+    """remove unlinks files inside the images dir and reports their size."""
+
+    (tmp_path / "a.png").write_bytes(b"12345")
+    outside = tmp_path.parent / f"{tmp_path.name}-outside.png"
+    outside.write_bytes(b"keep")
+    gc = ImageGarbageCollector(tmp_path, grace_seconds=0, batch_size=10)
+
+    reclaimed = await gc.remove(["a.png", "missing.png", f"../{outside.name}", None])
+
+    assert reclaimed == 5
+    assert gc.reclaimed_bytes == 5
+    assert not (tmp_path / "a.png").exists()
+    assert outside.exists()
+
+
+@pytest.mark.asyncio
+async def test_image_gc_reconcile_removes_unreferenced_old_files(tmp_path):
+    """reconcile deletes old files that no note references, in batches."""
+
+    for name in ("kept.png", "orphan1.png", "orphan2.png", "fresh.png"):
+        (tmp_path / name).write_bytes(b"xx")
+    old = 1_000_000_000
+    for name in ("kept.png", "orphan1.png", "orphan2.png"):
+        os.utime(tmp_path / name, (old, old))
+
+    session = _make_session()
+    session.scalars = AsyncMock(side_effect=lambda statement: iter(["kept.png"]))
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=session)
+    context.__aexit__ = AsyncMock(return_value=False)
+    helper = MagicMock()
+    helper.session_factory = MagicMock(return_value=context)
+    gc = ImageGarbageCollector(tmp_path, grace_seconds=3600, batch_size=2)
+
+    reclaimed = await gc.reconcile(helper)
+
+    assert reclaimed == 4
+    assert sorted(os.listdir(tmp_path)) == ["fresh.png", "kept.png"]
+    assert session.scalars.await_count == 2
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, status
 from fastapi.responses import HTMLResponse
 
 from app.core.config import settings
+from app.core.page_cache import page_cache
 from app.core.templates import templates
 
 router = APIRouter(
@@ -17,6 +18,10 @@ router = APIRouter(
     response_description="Sign in / sign up / reset password page",
     status_code=status.HTTP_200_OK,
 )
+@page_cache.cached(
+    ttl=settings.page_cache.account_ttl,
+    cache_control=settings.page_cache.account_cache_control,
+)
 async def account_page(request: Request):
     return templates.TemplateResponse(
         request,
@@ -2,7 +2,9 @@ import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
+from app.core.assets import assets
 from app.main import main_app
+from app.utils.downloading_pictures import IMAGES_DIR
 
 ACCOUNT_URL = "/api/v1/account/"
 
@@ -21,9 +23,9 @@ def test_account_page_renders(client):
     assert "Sign in" in r.text
     assert "Sign up" in r.text
     assert "Continue with Google" in r.text
-    # external assets, not inline
-    assert "css/style.css" in r.text
-    assert "js/auth.js" in r.text
+    # external fingerprinted assets, not inline
+    assert f"/static/dist/{assets.path_for('css/style.css')}" in r.text
+    assert f"/static/dist/{assets.path_for('js/auth.js')}" in r.text
 
 
 def test_account_page_localized_ru(client):
@@ -35,3 +37,43 @@ def test_account_page_localized_ru(client):
     assert 'lang="ru"' in r.text
     assert "Войти через Google" in r.text
     assert "Sign in" not in r.text
+
+
+def test_account_page_revalidates_with_etag(client):
+    """Repeat visits with the page ETag get a 304 that varies on the cookie."""
+
+    first = client.get(ACCOUNT_URL, cookies={"locale": "en"})
+
+    assert "Cookie" in first.headers["vary"]
+    assert first.headers["cache-control"] == "private, max-age=300"
+
+    r = client.get(
+        ACCOUNT_URL,
+        cookies={"locale": "en"},
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+
+    assert r.status_code == status.HTTP_304_NOT_MODIFIED
+    assert r.content == b""
+
+
+def test_note_images_are_not_cached(client):
+    """Uploaded images are kept out of shared caches and not hashed."""
+
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    image = IMAGES_DIR / "cache-test.png"
+    image.write_bytes(b"\x89PNG\r\n\x1a\n")
+    try:
+        r = client.get("/static/images/cache-test.png")
+    finally:
+        image.unlink()
+
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["cache-control"] == "private, no-store"
+    assert "etag" in r.headers
+
+
+def test_asset_manifest_is_not_served(client):
+    """The manifest is not fingerprinted, so it is not exposed as an immutable asset."""
+
+    assert client.get("/static/dist/manifest.json").status_code == status.HTTP_404_NOT_FOUND
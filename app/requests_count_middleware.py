@@ -1,36 +1,58 @@
-from collections import defaultdict
-from dataclasses import dataclass, field
+import time
 
-from fastapi import Request, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.core.types.call_next import CallNext
+from app.core.config import settings
+from app.core.shared_stats import EXCEPTION_STATUS, UNMATCHED_KEY, SharedRequestStats
 
 
-@dataclass
-class PathCounts:
-    count: int = 0
-    statuses_counts: defaultdict[int, int] = field(
-        default_factory=lambda: defaultdict(int)
-    )
+def route_key(scope: Scope, root_path: str) -> str:
+    """Template of the route that handled the request, never the raw path.
 
+    Mounted apps without routes of their own (static files) are keyed by
+    their mount path, requests that matched nothing share one key.
+    """
+    mount_path = scope.get("root_path", "")[len(root_path) :]
+    route = scope.get("route")
+    if route is not None:
+        return mount_path + route.path_format
+    return mount_path or UNMATCHED_KEY
 
-class RequestsCountMiddlewareDispatch:
-    def __init__(self):
-        self.counts = defaultdict[str, PathCounts](PathCounts)
 
-    async def __call__(
-        self,
-        request: Request,
-        call_next: CallNext,
-    ) -> Response:
-        path = request.url.path
-        self.counts[path].count += 1
+class RequestsCountMiddleware:
+    def __init__(self, app: ASGIApp, stats: SharedRequestStats):
+        self.app = app
+        self.stats = stats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        start_time = time.perf_counter()
+        status_code = EXCEPTION_STATUS
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
         try:
-            response = await call_next(request)
-        except Exception:
-            self.counts[path].statuses_counts[999] += 1
-            raise
-        self.counts[path].statuses_counts[response.status_code] += 1
-        return response
-
-requests_count_middleware_dispatch = RequestsCountMiddlewareDispatch()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.stats.record(
+                route_key(scope, root_path),
+                status_code,
+                time.perf_counter() - start_time,
+            )
+
+
+# created on import, before gunicorn forks its workers
+requests_stats = SharedRequestStats(
+    regions=2 * settings.gunicorn.workers,
+    max_keys=settings.stats.max_keys,
+    max_statuses=settings.stats.max_statuses,
+    buckets=settings.stats.latency_buckets,
+)
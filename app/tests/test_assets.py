@@ -0,0 +1,94 @@
+import orjson
+import pytest
+from fastapi import FastAPI, Request, status
+from fastapi.templating import Jinja2Templates
+from fastapi.testclient import TestClient
+
+from app.core.assets import MANIFEST_NAME, AssetManifest, asset_url, minify_css
+from app.core.http_cache import HashedStaticFiles
+
+CSS = "/* theme */\n.card  p {\n    color: red;\n}\n"
+
+
+def test_minify_css():
+    assert minify_css(CSS) == ".card p{color: red;}"
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text(CSS)
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "main.js").write_text("console.log(1);")
+    return tmp_path
+
+
+def _manifest(static_dir) -> AssetManifest:
+    return AssetManifest(
+        source_dir=static_dir,
+        output_dir=static_dir / "dist",
+        names=("css/style.css", "js/main.js"),
+        minify=True,
+    )
+
+
+def test_build_writes_hashed_copies_and_manifest(static_dir):
+    paths = _manifest(static_dir).build()
+
+    css = paths["css/style.css"]
+    assert css.startswith("css/style.") and css.endswith(".css")
+    assert (static_dir / "dist" / css).read_text() == ".card p{color: red;}"
+    assert (static_dir / "dist" / paths["js/main.js"]).read_text() == "console.log(1);"
+    assert orjson.loads((static_dir / "dist" / MANIFEST_NAME).read_bytes()) == paths
+
+
+def test_rebuild_keeps_only_previous_generation(static_dir):
+    """Changed content gets a new URL; one older build is kept for cached pages."""
+
+    manifest = _manifest(static_dir)
+    first = manifest.build()["js/main.js"]
+    (static_dir / "js" / "main.js").write_text("console.log(2);")
+    second = manifest.build()["js/main.js"]
+    (static_dir / "js" / "main.js").write_text("console.log(3);")
+    third = manifest.build()["js/main.js"]
+
+    assert len({first, second, third}) == 3
+    assert not (static_dir / "dist" / first).exists()
+    assert (static_dir / "dist" / second).exists()
+    assert (static_dir / "dist" / third).exists()
+
+
+def test_asset_url_resolves_to_immutable_file(static_dir, monkeypatch):
+    manifest = _manifest(static_dir)
+    manifest.build()
+    monkeypatch.setattr("app.core.assets.assets", manifest)
+    (static_dir / "page.html").write_text(
+        "{{ asset_url('css/style.css') }} {{ asset_url('css/other.css') }}"
+    )
+    templates = Jinja2Templates(directory=static_dir)
+    templates.env.globals["asset_url"] = asset_url
+
+    app = FastAPI()
+    app.mount(
+        "/static/dist",
+        HashedStaticFiles(directory=static_dir / "dist", cache_control="immutable"),
+        name="assets",
+    )
+    app.mount(
+        "/static",
+        HashedStaticFiles(directory=static_dir, cache_control="no-cache"),
+        name="static",
+    )
+
+    @app.get("/")
+    async def page(request: Request):
+        return templates.TemplateResponse(request=request, name="page.html")
+
+    client = TestClient(app)
+    asset, fallback = client.get("/").text.split()
+
+    assert asset == f"http://testserver/static/dist/{manifest.path_for('css/style.css')}"
+    assert fallback == "http://testserver/static/css/other.css"
+    response = client.get(asset)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["cache-control"] == "immutable"
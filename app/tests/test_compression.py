@@ -0,0 +1,196 @@
+import gzip
+import os
+
+import pytest
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import (
+    STATIC_FILE_MODE,
+    CompressionMiddleware,
+    encoded_etag,
+    precompress_static,
+    select_encoding,
+    write_atomic,
+)
+from app.core.http_cache import HashedStaticFiles, etag_matches, strong_etag
+
+BODY = "note " * 200
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("", None),
+        ("gzip", "gzip"),
+        ("gzip;q=0", None),
+        ("deflate, *", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("identity", None),
+    ],
+)
+def test_select_encoding(header, expected):
+    """Encodings are negotiated in server preference, honouring q=0 and *."""
+
+    assert select_encoding(header, ("br", "gzip")) == expected
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=500,
+        gzip_level=6,
+        brotli_quality=4,
+        zstd_level=3,
+    )
+    etag = strong_etag(BODY.encode())
+
+    @app.get("/text")
+    async def text(request: Request):
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"etag": etag})
+        return PlainTextResponse(BODY, headers={"etag": etag})
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(
+            gzip.compress(BODY.encode()),
+            media_type="text/plain",
+            headers={"content-encoding": "gzip"},
+        )
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield BODY
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return TestClient(app, headers={"Accept-Encoding": "gzip"})
+
+
+def test_compresses_text_responses(client):
+    """Text above the threshold is gzipped and its ETag names the variant."""
+
+    response = client.get("/text")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == encoded_etag(strong_etag(BODY.encode()), "gzip")
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.text == BODY
+
+
+def test_revalidates_encoded_variant(client):
+    """The variant ETag is mapped back for the app and restored on the 304."""
+
+    etag = client.get("/text").headers["etag"]
+
+    response = client.get("/text", headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["etag"] == etag
+
+
+def test_skips_small_responses(client):
+    response = client.get("/small")
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == "ok"
+
+
+def test_keeps_existing_encoding(client):
+    """Already encoded bodies are passed through untouched."""
+
+    response = client.get("/encoded")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
+
+
+def test_compresses_streaming_responses(client):
+    response = client.get("/stream")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == BODY * 3
+
+
+def test_identity_when_not_accepted(client):
+    response = client.get("/text", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text(BODY)
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "upload.svg").write_text(BODY)
+    return tmp_path
+
+
+def test_precompress_static_writes_fresh_siblings(static_dir):
+    """Siblings are written once, skipping excluded directories."""
+
+    assert precompress_static(static_dir, skip_dirs=("images",)) >= 1
+    sibling = static_dir / "css" / "style.css.gz"
+
+    assert gzip.decompress(sibling.read_bytes()).decode() == BODY
+    assert not (static_dir / "images" / "upload.svg.gz").exists()
+    assert precompress_static(static_dir, skip_dirs=("images",)) == 0
+
+
+def test_write_atomic_leaves_file_readable(tmp_path):
+    """Files are not left with the owner-only mode mkstemp creates them with."""
+
+    target = tmp_path / "style.css.gz"
+
+    write_atomic(target, b"data")
+
+    assert target.read_bytes() == b"data"
+    assert target.stat().st_mode & 0o777 == STATIC_FILE_MODE
+
+
+def test_static_serves_precompressed_sibling(static_dir):
+    precompress_static(static_dir)
+    (static_dir / "css" / "style.css.gz").write_bytes(
+        gzip.compress(b"from sibling")
+    )
+    app = FastAPI()
+    app.mount("/static", HashedStaticFiles(directory=static_dir, cache_control="no-cache"))
+    client = TestClient(app, headers={"Accept-Encoding": "gzip"})
+
+    response = client.get("/static/css/style.css")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == encoded_etag(strong_etag(BODY.encode()), "gzip")
+    assert response.text == "from sibling"
+
+
+def test_static_ignores_stale_sibling(static_dir):
+    precompress_static(static_dir)
+    source = static_dir / "css" / "style.css"
+    sibling_mtime = os.stat(source.with_name("style.css.gz")).st_mtime_ns
+    os.utime(source, ns=(sibling_mtime + 1, sibling_mtime + 1))
+    app = FastAPI()
+    app.mount("/static", HashedStaticFiles(directory=static_dir, cache_control="no-cache"))
+    client = TestClient(app, headers={"Accept-Encoding": "gzip"})
+
+    response = client.get("/static/css/style.css")
+
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY
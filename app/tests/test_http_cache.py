@@ -0,0 +1,118 @@
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from app.core.http_cache import HashedStaticFiles, etag_matches, strong_etag
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", "abc"', True),
+        ("*", True),
+        ('"abcd"', False),
+    ],
+)
+def test_etag_matches(header, expected):
+    """If-None-Match uses weak comparison and accepts lists and *."""
+
+    assert etag_matches(header, '"abc"') is expected
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "style.css").write_text("body { color: red; }")
+    return tmp_path
+
+
+@pytest.fixture
+def client(static_dir):
+    app = FastAPI()
+    app.mount(
+        "/static",
+        HashedStaticFiles(directory=static_dir, cache_control="public, max-age=60"),
+    )
+    return TestClient(app)
+
+
+def test_static_etag_is_content_hash(client):
+    """Static files carry an ETag derived from their bytes."""
+
+    response = client.get("/static/style.css")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == strong_etag(b"body { color: red; }")
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+
+def test_static_if_none_match_returns_304(client):
+    """Revalidation with the current ETag skips the body."""
+
+    etag = client.get("/static/style.css").headers["etag"]
+
+    response = client.get("/static/style.css", headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_static_etag_follows_file_changes(client, static_dir):
+    """A changed file gets a new ETag."""
+
+    first = client.get("/static/style.css").headers["etag"]
+    (static_dir / "style.css").write_text("body { color: blue; margin: 0; }")
+
+    assert client.get("/static/style.css").headers["etag"] != first
+
+
+def test_static_etag_cache_is_bounded(static_dir):
+    """Only the most recently served hashes are kept."""
+
+    for name in ("a.css", "b.css", "c.css"):
+        (static_dir / name).write_text(name)
+    files = HashedStaticFiles(directory=static_dir, cache_control="no-cache", max_etags=2)
+    client = TestClient(files)
+
+    for name in ("a.css", "b.css", "a.css", "c.css"):
+        assert client.get(f"/{name}").status_code == status.HTTP_200_OK
+
+    assert [path.rsplit("/", 1)[-1] for path in files._etags] == ["a.css", "c.css"]
+
+
+def test_static_size_mtime_etags_skip_hashing(static_dir):
+    """With content_etags off, files are not read to build the validator."""
+
+    files = HashedStaticFiles(
+        directory=static_dir, cache_control="private, no-store", content_etags=False
+    )
+    client = TestClient(files)
+
+    first = client.get("/style.css")
+    revalidated = client.get("/style.css", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.headers["etag"] != strong_etag(b"body { color: red; }")
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+    assert files._etags == {}
+
+
+def test_hidden_paths_are_not_served(static_dir):
+    """Hidden files and their precompressed siblings answer 404."""
+
+    (static_dir / "manifest.json").write_text("{}")
+    (static_dir / "manifest.json.gz").write_bytes(b"")
+    app = FastAPI()
+    app.mount(
+        "/static",
+        HashedStaticFiles(
+            directory=static_dir, cache_control="no-cache", hidden=("manifest.json",)
+        ),
+    )
+    client = TestClient(app)
+
+    assert client.get("/static/manifest.json").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/static/manifest.json.gz").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/static/style.css").status_code == status.HTTP_200_OK
@@ -0,0 +1,74 @@
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.leader import LeaderElection
+from app.core.metrics import Metric, metrics
+
+
+def _election(lock_granted: bool) -> tuple[LeaderElection, AsyncMock]:
+    connection = AsyncMock()
+    connection.scalar.return_value = lock_granted
+    engine = MagicMock()
+    engine.connect = AsyncMock(return_value=connection)
+    return LeaderElection(engine=engine, lock_id=42, interval=10), connection
+
+
+@pytest.mark.asyncio
+async def test_worker_holding_the_lock_leads():
+    election, connection = _election(lock_granted=True)
+
+    await election.campaign()
+
+    assert election.is_leader
+    assert election.leader_pid() == os.getpid()
+    connection.commit.assert_awaited()
+    connection.close.assert_not_awaited()
+
+    await election.stop()
+    connection.close.assert_awaited_once()
+    assert election.leader_pid() is None
+
+
+@pytest.mark.asyncio
+async def test_worker_without_the_lock_follows():
+    election, connection = _election(lock_granted=False)
+
+    await election.campaign()
+
+    assert not election.is_leader
+    connection.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_lost_connection_resigns():
+    """A failed liveness check gives up leadership so another worker can take over."""
+
+    election, connection = _election(lock_granted=True)
+    await election.campaign()
+    metrics.set(Metric.SWEEP_BACKLOG, 12)
+    connection.execute.side_effect = OperationalError("SELECT 1", {}, OSError("gone"))
+
+    await election.campaign()
+
+    assert not election.is_leader
+    assert election.leader_pid() is None
+    # a new leader's sweeps replace the figures of the old one
+    assert metrics.totals(live_only=True)[Metric.SWEEP_BACKLOG] == 0
+
+
+@pytest.mark.asyncio
+async def test_leader_only_skips_followers():
+    election, _ = _election(lock_granted=True)
+    job = AsyncMock()
+    guarded = election.leader_only(job)
+
+    await guarded(1)
+    job.assert_not_awaited()
+
+    await election.campaign()
+    await guarded(1)
+    job.assert_awaited_once_with(1)
+    await election.stop()
@@ -0,0 +1,59 @@
+import pytest
+from babel.messages.catalog import Catalog
+from babel.messages.mofile import write_mo
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from fastapi_babel import BabelConfigs
+
+from app.localization import LocaleCatalogs, _, set_locale
+
+
+@pytest.fixture
+def locale_catalogs(tmp_path):
+    for locale in ("en", "ru"):
+        (tmp_path / "locales" / locale / "LC_MESSAGES").mkdir(parents=True)
+    catalog = Catalog(locale="ru")
+    catalog.add("Hello", "Привет")
+    with open(tmp_path / "locales" / "ru" / "LC_MESSAGES" / "messages.mo", "wb") as file:
+        write_mo(file, catalog)
+    return LocaleCatalogs(
+        BabelConfigs(
+            ROOT_DIR=tmp_path / "localization.py",
+            BABEL_DEFAULT_LOCALE="en",
+            BABEL_TRANSLATION_DIRECTORY="locales",
+        )
+    )
+
+
+def test_catalogs_are_loaded_per_locale(locale_catalogs):
+    assert set(locale_catalogs.catalogs) == {"ru"}
+    assert locale_catalogs.gettext("ru")("Hello") == "Привет"
+    assert locale_catalogs.gettext("de")("Hello") == "Hello"
+
+
+def test_gettext_outside_localized_routes_is_identity():
+    assert _("Resource not found") == "Resource not found"
+
+
+def test_only_localized_routers_translate(locale_catalogs, monkeypatch):
+    """Routers without the dependency never select a catalog."""
+
+    monkeypatch.setattr("app.localization.catalogs", locale_catalogs)
+    localized = APIRouter()
+    plain = APIRouter()
+
+    @localized.get("/page")
+    async def page():
+        return {"text": _("Hello")}
+
+    @plain.get("/api")
+    async def api():
+        return {"text": _("Hello")}
+
+    app = FastAPI()
+    app.include_router(localized, dependencies=[Depends(set_locale)])
+    app.include_router(plain)
+    client = TestClient(app, cookies={"locale": "ru"})
+
+    assert client.get("/page").json() == {"text": "Привет"}
+    assert client.get("/api").json() == {"text": "Hello"}
@@ -0,0 +1,52 @@
+import io
+import logging
+import time
+
+import orjson
+
+from app.core.logs import ACCESS_LOGGER_NAME, JsonFormatter, LoggingPipeline
+
+
+def _wait_for(stream, lines, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while stream.getvalue().count("\n") < lines and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return stream.getvalue().splitlines()
+
+
+def test_json_formatter_inlines_fields():
+    """Fields passed through extra end up as top-level JSON keys."""
+
+    record = logging.LogRecord(
+        ACCESS_LOGGER_NAME, logging.INFO, __file__, 1, "GET %s", ("/",), None
+    )
+    record.fields = {"status": 200, "duration_ms": 1.5}
+
+    payload = orjson.loads(JsonFormatter().format(record))
+
+    assert payload["message"] == "GET /"
+    assert payload["logger"] == ACCESS_LOGGER_NAME
+    assert payload["status"] == 200
+    assert payload["duration_ms"] == 1.5
+
+
+def test_pipeline_writes_from_background_thread():
+    """Records go through the queue; access lines are JSON, others plain text."""
+
+    stream = io.StringIO()
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    pipeline = LoggingPipeline(stream=stream, level="INFO", log_format="%(levelname)s %(message)s")
+    try:
+        pipeline.start()
+        logging.getLogger("app.test").info("hello %s", "world")
+        logging.getLogger(ACCESS_LOGGER_NAME).info(
+            "GET /", extra={"fields": {"status": 200}}
+        )
+        lines = _wait_for(stream, 2)
+    finally:
+        pipeline.stop()
+        root.handlers, root.level = handlers, level
+
+    assert lines[0] == "INFO hello world"
+    assert orjson.loads(lines[1])["status"] == 200
@@ -0,0 +1,185 @@
+import os
+import signal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.metrics import Metric, render_metrics, timed_job
+from app.core.models.db_helper import InstrumentedQueuePool
+from app.core.shared_stats import SharedMetrics, SharedRequestStats
+
+
+@pytest.fixture
+def metrics():
+    shared = SharedMetrics(
+        regions=2, size=len(Metric), gauges=(Metric.DB_POOL_CHECKED_OUT, Metric.DB_POOL_OVERFLOW)
+    )
+    with (
+        patch("app.core.metrics.metrics", shared),
+        patch("app.core.models.db_helper.metrics", shared),
+    ):
+        yield shared
+
+
+@pytest.fixture
+def requests_stats():
+    return SharedRequestStats(regions=1, max_keys=8, max_statuses=4, buckets=(0.1, 1.0))
+
+
+def test_render_exposes_request_counters_and_histograms(metrics, requests_stats):
+    """Request stats are rendered as labelled counters and cumulative buckets."""
+
+    requests_stats.record("/notes/{note_id}", 200, 0.05)
+    requests_stats.record("/notes/{note_id}", 404, 0.5)
+
+    body = render_metrics(requests_stats)
+
+    assert "# TYPE http_requests_total counter" in body
+    assert 'http_requests_total{route="/notes/{note_id}",status="200"} 1' in body
+    assert 'http_requests_total{route="/notes/{note_id}",status="404"} 1' in body
+    assert 'http_request_duration_seconds_bucket{route="/notes/{note_id}",le="0.1"} 1' in body
+    assert 'http_request_duration_seconds_bucket{route="/notes/{note_id}",le="1.0"} 2' in body
+    assert 'http_request_duration_seconds_bucket{route="/notes/{note_id}",le="+Inf"} 2' in body
+    assert 'http_request_duration_seconds_count{route="/notes/{note_id}"} 2' in body
+
+
+def test_counters_are_summed_across_workers(metrics, requests_stats):
+    """Counters written by other processes show up in the exposition."""
+
+    metrics.inc(Metric.NOTES_CREATED, 2)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            metrics.inc(Metric.NOTES_CREATED, 3)
+            metrics.inc(Metric.IMAGE_UPLOAD_BYTES, 1024)
+            metrics.set(Metric.DB_POOL_CHECKED_OUT, 7)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    metrics.set(Metric.DB_POOL_CHECKED_OUT, 1)
+
+    body = render_metrics(requests_stats)
+
+    assert "notes_created_total 5" in body
+    assert "image_upload_bytes_total 1024" in body
+    # gauges of exited workers are dropped
+    assert "db_pool_checked_out 1" in body
+
+
+@pytest.mark.asyncio
+async def test_timed_job_records_runs_and_duration(metrics, requests_stats):
+    """Scheduler jobs are counted even when they fail."""
+
+    async def failing_job():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await timed_job("image_gc_reconcile", failing_job)()
+
+    totals = metrics.totals()
+    assert totals[Metric.IMAGE_GC_JOB_RUNS] == 1
+    assert 'scheduler_job_duration_seconds_count{job="image_gc_reconcile"} 1' in render_metrics(
+        requests_stats
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_publishes_checkout_gauges(metrics):
+    """The pool reports checked out and overflow connections and checkout waits."""
+
+    pool = InstrumentedQueuePool(creator=MagicMock, pool_size=1, max_overflow=1)
+
+    first = await greenlet_spawn(pool.connect)
+    second = await greenlet_spawn(pool.connect)
+    totals = metrics.totals()
+    assert totals[Metric.DB_POOL_CHECKED_OUT] == 2
+    assert totals[Metric.DB_POOL_OVERFLOW] == 1
+    assert totals[Metric.DB_POOL_WAITS] == 2
+
+    await greenlet_spawn(second.close)
+    await greenlet_spawn(first.close)
+    assert metrics.totals()[Metric.DB_POOL_CHECKED_OUT] == 0
+
+
+def test_replacement_worker_does_not_inherit_gauges(metrics, requests_stats):
+    """A worker reusing a dead worker's region keeps its counters but not its gauges."""
+
+    metrics.set(Metric.DB_POOL_CHECKED_OUT, 1)
+    pid = os.fork()
+    if pid == 0:
+        metrics.inc(Metric.NOTES_CREATED, 3)
+        metrics.set(Metric.DB_POOL_CHECKED_OUT, 7)
+        signal.pause()
+    while metrics.totals(live_only=True)[Metric.DB_POOL_CHECKED_OUT] != 8:
+        os.sched_yield()
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+
+    ready, release = os.pipe(), os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # takes over the dead worker's region, the only free one
+            metrics.inc(Metric.NOTES_CREATED)
+            os.write(ready[1], b"x")
+            os.read(release[0], 1)
+        finally:
+            os._exit(0)
+    os.read(ready[0], 1)
+
+    body = render_metrics(requests_stats)
+    os.write(release[1], b"x")
+    os.waitpid(pid, 0)
+
+    assert "notes_created_total 4" in body
+    assert "db_pool_checked_out 1" in body
+
+
+def test_leader_pid_is_read_from_the_leader_region(metrics, requests_stats):
+    """A pid left in another worker's slot is not added to the leader's."""
+
+    ready, release = os.pipe(), os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # e.g. inherited from a dead leader before the region was adopted
+            metrics.set(Metric.SCHEDULER_LEADER_PID, 25095)
+            os.write(ready[1], b"x")
+            os.read(release[0], 1)
+        finally:
+            os._exit(0)
+    os.read(ready[0], 1)
+    metrics.set(Metric.SCHEDULER_LEADER_PID, os.getpid())
+
+    body = render_metrics(requests_stats)
+    os.write(release[1], b"x")
+    os.waitpid(pid, 0)
+
+    assert f"scheduler_leader_pid {os.getpid()}\n" in body
+
+
+def test_sweep_gauges_come_from_the_leader_only(metrics, requests_stats):
+    """Sweep figures of a former leader are not added to the current one's."""
+
+    ready, release = os.pipe(), os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            metrics.set(Metric.SWEEP_BACKLOG, 40)
+            metrics.set(Metric.SWEEP_ROWS_PER_SECOND, 900)
+            os.write(ready[1], b"x")
+            os.read(release[0], 1)
+        finally:
+            os._exit(0)
+    os.read(ready[0], 1)
+    metrics.set(Metric.SCHEDULER_LEADER_PID, os.getpid())
+    metrics.set(Metric.SWEEP_BACKLOG, 42)
+    metrics.set(Metric.SWEEP_ROWS_PER_SECOND, 1000)
+
+    body = render_metrics(requests_stats)
+    os.write(release[1], b"x")
+    os.waitpid(pid, 0)
+
+    assert "sweep_backlog_notes 42\n" in body
+    assert "sweep_rows_per_second 1000\n" in body
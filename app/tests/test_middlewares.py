@@ -0,0 +1,192 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middlewares import (
+    AccessLogMiddleware,
+    FormSizeLimitMiddleware,
+    ProcessTimeHeaderMiddleware,
+)
+from app.core.shared_stats import UNMATCHED_KEY, SharedRequestStats
+from app.requests_count_middleware import RequestsCountMiddleware
+
+
+@pytest.fixture
+def stats():
+    return SharedRequestStats(regions=1, max_keys=8, max_statuses=4, buckets=(0.1, 1.0))
+
+
+def _client(stats, sample_rate=1.0):
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return PlainTextResponse("ok")
+
+    @app.get("/missing")
+    async def missing():
+        return PlainTextResponse("missing", status_code=status.HTTP_404_NOT_FOUND)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return PlainTextResponse(item_id)
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for chunk in (b"a", b"b", b"c"):
+                yield chunk
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(
+        ProcessTimeHeaderMiddleware,
+        process_time_header_name="X-Process-Time",
+    )
+    app.add_middleware(RequestsCountMiddleware, stats=stats)
+    app.add_middleware(AccessLogMiddleware, sample_rate=sample_rate)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+@pytest.fixture
+def client(stats):
+    return _client(stats)
+
+
+def test_process_time_header_is_set(client):
+    """Every response carries the time spent producing it."""
+
+    response = client.get("/ok")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Process-Time"].endswith("s")
+    float(response.headers["X-Process-Time"][:-1])
+
+
+def test_requests_are_counted_per_path_and_status(client, stats):
+    """Counts group by path and status, with 999 for unhandled exceptions."""
+
+    client.get("/ok")
+    client.get("/ok")
+    client.get("/missing")
+    client.get("/boom")
+    counts = stats.snapshot()
+
+    assert counts["/ok"].count == 2
+    assert dict(counts["/ok"].statuses_counts) == {200: 2}
+    assert dict(counts["/missing"].statuses_counts) == {404: 1}
+    assert dict(counts["/boom"].statuses_counts) == {999: 1}
+
+
+def test_requests_are_keyed_by_route_template(client, stats):
+    """Path parameters never become stats keys; unknown paths share one key."""
+
+    client.get("/items/secret-note-text")
+    client.get("/items/another")
+    client.get("/no/such/path")
+
+    counts = stats.snapshot()
+    assert set(counts) == {"/items/{item_id}", UNMATCHED_KEY}
+    assert counts["/items/{item_id}"].count == 2
+    assert dict(counts[UNMATCHED_KEY].statuses_counts) == {404: 1}
+    assert counts["/items/{item_id}"].latency_max > 0
+
+
+def test_streaming_response_passes_through(client, stats):
+    """Streaming bodies are forwarded as is and counted once."""
+
+    response = client.get("/stream")
+    counts = stats.snapshot()
+
+    assert response.text == "abc"
+    assert "X-Process-Time" in response.headers
+    assert dict(counts["/stream"].statuses_counts) == {200: 1}
+
+
+def test_access_line_per_request(client, caplog):
+    """Each request produces one access record keyed by route template."""
+
+    with caplog.at_level("INFO", logger="app.access"):
+        client.get("/items/secret-note-text")
+
+    [record] = [r for r in caplog.records if r.name == "app.access"]
+    assert record.getMessage() == "GET /items/{item_id} 200"
+    assert record.fields["route"] == "/items/{item_id}"
+    assert record.fields["status"] == 200
+    assert "secret-note-text" not in str(record.fields)
+
+
+def test_access_log_samples_only_successes(stats, caplog):
+    """With sampling off successful requests are skipped, failures never are."""
+
+    client = _client(stats, sample_rate=0.0)
+
+    with caplog.at_level("INFO", logger="app.access"):
+        client.get("/ok")
+        client.get("/missing")
+        client.get("/boom")
+
+    records = [r for r in caplog.records if r.name == "app.access"]
+    assert [record.fields["status"] for record in records] == [404, 999]
+    assert records[-1].levelname == "ERROR"
+
+
+@pytest.fixture
+def upload_client():
+    app = FastAPI()
+    parsed = []
+
+    @app.post("/upload")
+    async def upload(image: UploadFile = File(...)):
+        parsed.append(image.filename)
+        return PlainTextResponse("ok")
+
+    app.add_middleware(FormSizeLimitMiddleware, max_size=1024)
+    client = TestClient(app)
+    client.parsed = parsed
+    return client
+
+
+def test_form_within_limit_is_parsed(upload_client):
+    response = upload_client.post("/upload", files={"image": ("a.png", b"x" * 100)})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert upload_client.parsed == ["a.png"]
+
+
+def test_oversized_form_is_rejected_before_parsing(upload_client):
+    """A declared length over the limit never reaches the form parser."""
+
+    response = upload_client.post("/upload", files={"image": ("a.png", b"x" * 4096)})
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert upload_client.parsed == []
+
+
+def test_oversized_form_without_length_is_cut_off(upload_client):
+    """Chunked bodies are counted while they are received."""
+
+    body = (
+        b"--b\r\n"
+        b'Content-Disposition: form-data; name="image"; filename="a.png"\r\n\r\n'
+        + b"x" * 4096
+        + b"\r\n--b--\r\n"
+    )
+
+    def chunks():
+        for start in range(0, len(body), 512):
+            yield body[start : start + 512]
+
+    response = upload_client.post(
+        "/upload",
+        content=chunks(),
+        headers={"content-type": "multipart/form-data; boundary=b"},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert upload_client.parsed == []
@@ -0,0 +1,144 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import Request, status
+from fastapi.responses import HTMLResponse
+
+from app.core.page_cache import PageCache
+
+
+def _key(name):
+    return ("http://testserver/", f"/{name}", "en", ())
+
+
+def _renderer(body, status_code=status.HTTP_200_OK):
+    calls = []
+
+    async def render():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return HTMLResponse(body, status_code=status_code)
+
+    return render, calls
+
+
+@pytest.mark.asyncio
+async def test_hit_serves_stored_bytes_without_rendering():
+    """A second request within the TTL reuses the encoded body."""
+
+    cache = PageCache(max_entries=8, max_bytes=1024)
+    render, calls = _renderer("<p>hi</p>")
+
+    await cache.get_or_render(_key("a"), 60, render)
+    page = await cache.get_or_render(_key("a"), 60, render)
+    response = page.to_response(None, "no-cache")
+
+    assert calls == [1]
+    assert response.body == b"<p>hi</p>"
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    assert response.headers["content-length"] == "9"
+    assert response.headers["etag"] == page.etag
+    assert response.headers["vary"] == "Cookie"
+    assert response.headers["cache-control"] == "no-cache"
+
+
+@pytest.mark.asyncio
+async def test_matching_if_none_match_gets_not_modified():
+    """A client holding the current ETag receives an empty 304."""
+
+    cache = PageCache(max_entries=8, max_bytes=1024)
+    render, _ = _renderer("<p>hi</p>")
+    page = await cache.get_or_render(_key("a"), 60, render)
+
+    response = page.to_response(f'W/"other", {page.etag}', "no-cache")
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.body == b""
+    assert response.headers["etag"] == page.etag
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl():
+    """Expired pages are rendered again."""
+
+    cache = PageCache(max_entries=8, max_bytes=1024)
+    render, calls = _renderer("x")
+
+    with patch("app.core.page_cache.time.monotonic", return_value=100.0):
+        await cache.get_or_render(_key("a"), 5, render)
+    with patch("app.core.page_cache.time.monotonic", return_value=106.0):
+        await cache.get_or_render(_key("a"), 5, render)
+
+    assert calls == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_lru_bounds_entries_and_bytes():
+    """The least recently used pages are evicted first."""
+
+    cache = PageCache(max_entries=2, max_bytes=10)
+    render, _ = _renderer("12345")
+
+    await cache.get_or_render(_key("a"), 60, render)
+    await cache.get_or_render(_key("b"), 60, render)
+    await cache.get_or_render(_key("a"), 60, render)
+    await cache.get_or_render(_key("c"), 60, render)
+
+    assert list(cache._pages) == [_key("a"), _key("c")]
+    assert cache.size == 10
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_render_once():
+    """Requests racing on a cold key wait for a single render."""
+
+    cache = PageCache(max_entries=8, max_bytes=1024)
+    render, calls = _renderer("x")
+
+    responses = await asyncio.gather(
+        *(cache.get_or_render(_key("a"), 60, render) for _ in range(10))
+    )
+
+    assert calls == [1]
+    assert {response.body for response in responses} == {b"x"}
+    assert cache._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_error_responses_are_not_cached():
+    """Only successful pages are stored."""
+
+    cache = PageCache(max_entries=8, max_bytes=1024)
+    render, calls = _renderer("oops", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    await cache.get_or_render(_key("a"), 60, render)
+    await cache.get_or_render(_key("a"), 60, render)
+
+    assert calls == [1, 1]
+
+
+def test_key_uses_route_template_locale_and_path_params():
+    """Different locales and path parameters get separate entries."""
+
+    class Route:
+        path_format = "/result/{note_id}"
+
+    scope = {
+        "type": "http",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": "/result/abc",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"cookie", b"locale=ru")],
+        "route": Route(),
+        "path_params": {"note_id": "abc"},
+    }
+
+    assert PageCache.key_for(Request(scope)) == (
+        "http://testserver/",
+        "/result/{note_id}",
+        "ru",
+        (("note_id", "abc"),),
+    )
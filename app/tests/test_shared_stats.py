@@ -0,0 +1,106 @@
+import os
+
+from app.core.shared_stats import OVERFLOW_KEY, SharedRequestStats
+
+
+BUCKETS = (0.01, 0.1, 1.0)
+
+
+def _stats(regions=1, max_keys=8, max_statuses=4):
+    return SharedRequestStats(
+        regions=regions, max_keys=max_keys, max_statuses=max_statuses, buckets=BUCKETS
+    )
+
+
+def _record(stats, key, status_code, times=1, seconds=0.005):
+    for _ in range(times):
+        stats.record(key, status_code, seconds)
+
+
+def test_counts_and_statuses_per_key():
+    """Rows are reused per key and statuses are tallied separately."""
+
+    stats = _stats()
+
+    _record(stats, "/a", 200, times=2)
+    _record(stats, "/a", 404)
+    _record(stats, "/b", 200)
+
+    snapshot = stats.snapshot()
+    assert snapshot["/a"].count == 3
+    assert dict(snapshot["/a"].statuses_counts) == {200: 2, 404: 1}
+    assert dict(snapshot["/b"].statuses_counts) == {200: 1}
+
+
+def test_keys_beyond_capacity_go_to_overflow_row():
+    """The table never grows past max_keys; extra keys share one row."""
+
+    stats = _stats(max_keys=3, max_statuses=2)
+
+    for index in range(5):
+        _record(stats, f"/path/{index}", 200)
+
+    snapshot = stats.snapshot()
+    assert set(snapshot) == {"/path/0", "/path/1", OVERFLOW_KEY}
+    assert snapshot[OVERFLOW_KEY].count == 3
+
+
+def test_latency_histogram_and_quantiles():
+    """Latencies land in fixed buckets; quantiles report bucket bounds and the max."""
+
+    stats = _stats()
+
+    _record(stats, "/a", 200, times=90, seconds=0.005)
+    _record(stats, "/a", 200, times=9, seconds=0.05)
+    _record(stats, "/a", 200, seconds=3.0)
+
+    counts = stats.snapshot()["/a"]
+    assert counts.latency_buckets == [90, 9, 0, 1]
+    assert counts.latency_quantile(0.5) == 0.01
+    assert counts.latency_quantile(0.9) == 0.01
+    assert counts.latency_quantile(0.99) == 0.1
+    assert counts.latency_quantile(1.0) == counts.latency_max == 3.0
+    assert round(counts.latency_sum, 3) == 3.9
+
+
+def test_counts_are_aggregated_across_forked_workers():
+    """Children write into the mapping inherited from the parent."""
+
+    stats = _stats(regions=4)
+    _record(stats, "/a", 200)
+
+    children = []
+    for status_code in (200, 500):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _record(stats, "/a", status_code, times=3)
+                _record(stats, "/child", 201)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+    snapshot = stats.snapshot()
+    assert snapshot["/a"].count == 7
+    assert dict(snapshot["/a"].statuses_counts) == {200: 4, 500: 3}
+    assert snapshot["/child"].count == 2
+
+
+def test_dead_worker_region_is_reused():
+    """A replacement worker continues from the counts of a dead one."""
+
+    stats = _stats()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _record(stats, "/a", 200)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    _record(stats, "/a", 200)
+
+    assert stats.snapshot()["/a"].count == 2
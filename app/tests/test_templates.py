@@ -0,0 +1,16 @@
+from jinja2 import FileSystemBytecodeCache
+
+from app.core.templates import precompile_templates, templates
+
+
+def test_precompile_fills_bytecode_cache(tmp_path, monkeypatch):
+    """Every template is compiled once and its bytecode stored for other workers."""
+
+    monkeypatch.setattr(templates.env, "bytecode_cache", FileSystemBytecodeCache(str(tmp_path)))
+    templates.env.cache.clear()
+
+    count = precompile_templates()
+
+    assert count == len(templates.env.list_templates()) > 0
+    assert len(list(tmp_path.iterdir())) == count
+    assert len(templates.env.cache) == count
@@ -1,24 +1,87 @@
 import asyncio
 import os
+import tempfile
 from pathlib import Path
 
 import uuid_utils as uuid
 from fastapi import UploadFile
 
+from app.core.config import settings
+from app.core.metrics import Metric, metrics
+
+IMAGES_DIR = Path("app/static/images").absolute()
+# mkstemp creates 0600 files, images are served to everyone
+IMAGE_FILE_MODE = 0o644
+
+IMAGE_SIGNATURES: tuple[tuple[bytes, str], ...] = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+class UnsupportedImageError(ValueError):
+    pass
+
+
+def detect_image_extension(header: bytes) -> str | None:
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
 
 async def download_image(
-    image: UploadFile, upload_dir: str = Path("app/static/images").absolute()
+    image: UploadFile,
+    upload_dir: str = IMAGES_DIR,
+    max_size: int = settings.images.max_upload_bytes,
+    chunk_size: int = settings.images.upload_chunk_size,
 ) -> str:
+    """Stream an upload to disk in fixed-size chunks and return its file name.
+
+    The type is taken from the magic bytes of the first chunk and the size
+    limit is enforced while reading, so memory use does not depend on the
+    upload size. The file only appears under its final name once complete.
+    Starlette has already spooled the upload to a temporary file by then;
+    oversized forms are refused earlier by ``FormSizeLimitMiddleware``.
+    """
     if image is None:
         raise ValueError("No image file provided")
+    if image.size is not None and image.size > max_size:
+        raise ImageTooLargeError("Image is too large")
 
-    os.makedirs(upload_dir, exist_ok=True)
+    chunk = await image.read(chunk_size)
+    file_extension = detect_image_extension(chunk)
+    if file_extension is None:
+        raise UnsupportedImageError("Unsupported image type")
 
-    file_extension = os.path.splitext(image.filename or "")[1]
+    os.makedirs(upload_dir, exist_ok=True)
     image_name = f"{uuid.uuid4().hex}{file_extension}"
     saved_path = os.path.join(upload_dir, image_name)
 
-    contents = await image.read()
-    await asyncio.to_thread(Path(saved_path).write_bytes, contents)
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            size = 0
+            while chunk:
+                size += len(chunk)
+                if size > max_size:
+                    raise ImageTooLargeError("Image is too large")
+                await asyncio.to_thread(temp_file.write, chunk)
+                chunk = await image.read(chunk_size)
+            os.fchmod(temp_file.fileno(), IMAGE_FILE_MODE)
+        await asyncio.to_thread(os.replace, temp_path, saved_path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+    metrics.inc(Metric.IMAGE_UPLOAD_BYTES, size)
 
     return image_name
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.core.config import settings
+from app.core.models.db_helper import DataBaseHelper
+from app.notes.models import Note
+from app.utils.downloading_pictures import IMAGES_DIR
+
+log = logging.getLogger(__name__)
+
+
+class ImageGarbageCollector:
+    """Removes note images from disk once their notes are gone.
+
+    Deleting code paths hand the freed names to ``remove`` (or ``discard``
+    to do it later in the background); ``reconcile`` catches everything
+    else by diffing the images directory against ``notes.image``. All
+    filesystem work runs in the default thread pool.
+    """
+
+    def __init__(self, images_dir: Path, grace_seconds: float, batch_size: int) -> None:
+        self.images_dir = Path(images_dir)
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.reclaimed_bytes = 0
+        self._background: set[asyncio.Task] = set()
+
+    async def remove(self, names: Iterable[str]) -> int:
+        names = [name for name in names if name]
+        if not names:
+            return 0
+        reclaimed = await asyncio.to_thread(self._unlink, names)
+        self.reclaimed_bytes += reclaimed
+        return reclaimed
+
+    def discard(self, names: Iterable[str], delay: float = 0) -> None:
+        """Remove images in the background, optionally after ``delay`` seconds."""
+        names = [name for name in names if name]
+        if not names:
+            return
+        task = asyncio.create_task(self._remove_later(names, delay))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def reconcile(self, db_helper: DataBaseHelper) -> int:
+        """Delete files older than the grace period that no note references."""
+        if not self.images_dir.is_dir():
+            return 0
+        cutoff = time.time() - self.grace_seconds
+        reclaimed = 0
+        with os.scandir(self.images_dir) as entries:
+            async with db_helper.session_factory() as session:
+                while True:
+                    batch, exhausted = await asyncio.to_thread(
+                        self._next_batch, entries, cutoff
+                    )
+                    if batch:
+                        referenced = set(
+                            await session.scalars(
+                                select(Note.image).where(
+                                    Note.image
+                                    == any_(bindparam("images", batch, type_=ARRAY(String)))
+                                )
+                            )
+                        )
+                        reclaimed += await self.remove(
+                            name for name in batch if name not in referenced
+                        )
+                    if exhausted:
+                        break
+        log.info("Image GC reclaimed %d bytes", reclaimed)
+        return reclaimed
+
+    async def _remove_later(self, names: list[str], delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            await self.remove(names)
+        except OSError:
+            log.exception("Failed to remove images %s", names)
+
+    def _unlink(self, names: list[str]) -> int:
+        reclaimed = 0
+        for name in names:
+            # names come from the database, never follow them out of the directory
+            path = self.images_dir / Path(name).name
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            reclaimed += size
+        return reclaimed
+
+    def _next_batch(self, entries: Iterator[os.DirEntry], cutoff: float) -> tuple[list[str], bool]:
+        batch = []
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                batch.append(entry.name)
+                if len(batch) >= self.batch_size:
+                    return batch, False
+        return batch, True
+
+
+image_gc = ImageGarbageCollector(
+    images_dir=IMAGES_DIR,
+    grace_seconds=settings.images.gc_grace_seconds,
+    batch_size=settings.images.gc_batch_size,
+)